@@ -0,0 +1,98 @@
+import os
+
+import pygame
+
+# !!! PHASE: ASSETS !!!
+# Images, sounds and fonts are loaded the first time something asks for
+# them and then cached, so nothing is decoded at import time and a process
+# that never draws never loads a font, and one that never plays a sound never
+# starts the mixer. Images are converted to the display format once, as soon
+# as a display exists.
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class SilentSound:
+    # Stands in for a pygame Sound when there is no audio (no device or a
+    # missing file)
+    def play(self, *args, **kwargs):
+        return None
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+    def get_volume(self):
+        return 0.0
+
+    def get_length(self):
+        return 0.0
+
+
+class AssetManager:
+    def __init__(self, asset_dir=ASSET_DIR):
+        self.asset_dir = asset_dir
+        self._images = {}
+        self._unconverted = set()
+        self._sounds = {}
+        self._fonts = {}
+        self._audio = None
+
+    def path(self, name):
+        return os.path.join(self.asset_dir, name)
+
+    def image(self, name, size=None):
+        key = (name, size)
+        image = self._images.get(key)
+        if image is not None and key not in self._unconverted:
+            return image
+        if image is None:
+            image = pygame.image.load(self.path(name))
+            if size is not None:
+                image = pygame.transform.scale(image, size)
+            self._unconverted.add(key)
+        if key in self._unconverted and pygame.display.get_surface() is not None:
+            # Blits of display-format surfaces skip the per-pixel conversion
+            image = image.convert_alpha()
+            self._unconverted.discard(key)
+        self._images[key] = image
+        return image
+
+    def sound(self, name):
+        sound = self._sounds.get(name)
+        if sound is None:
+            sound = SilentSound()
+            if self.audio_ready():
+                try:
+                    sound = pygame.mixer.Sound(self.path(name))
+                except (pygame.error, FileNotFoundError):
+                    pass
+            self._sounds[name] = sound
+        return sound
+
+    def font(self, size, name=None):
+        key = (name, size)
+        font = self._fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(name and self.path(name), size)
+            self._fonts[key] = font
+        return font
+
+    def audio_ready(self):
+        if self._audio is None:
+            self._audio = False
+            try:
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init()
+                self._audio = True
+            except pygame.error:
+                pass
+        return self._audio
+
+
+ASSETS = AssetManager()
+# !!! END PHASE: ASSETS !!!
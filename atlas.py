@@ -0,0 +1,104 @@
+import pygame
+
+from assets import ASSETS
+from text_cache import render_text
+
+# !!! PHASE: SPRITE ATLAS !!!
+# Bricks, the paddle, lasers and power-ups are drawn once per size and
+# color into shared atlas pages, the first time each is needed. After that
+# a whole layer of them is a single Surface.blits() call with source areas
+# instead of a pygame.draw call per entity (plus a rounded rect and a text
+# blit per power-up). An atlas built with a scale above 1 serves windows
+# larger than the game's 800x600: sprites are drawn at the larger size once
+# and only positions are scaled per frame, so nothing is resampled.
+#
+# A sprite is named by a key: (RECT, width, height, color) for a filled
+# rect, (POWER_UP, width, height, color, char) for a power-up capsule.
+# Entities drawn through an atlas have sprite_key() and topleft(alpha).
+
+RECT, POWER_UP = 'rect', 'power_up'
+# Size of the font for the power-up letters, before scaling
+POWERUP_FONT_SIZE = 20
+PAGE_SIZE = (1024, 512)
+# Transparent in the pages; no sprite color can blend into it
+COLORKEY = (255, 1, 254)
+
+
+class SpriteAtlas:
+    def __init__(self, scale=1):
+        self.scale = scale
+        self.pages = []
+        # key -> (page, area)
+        self.sprites = {}
+        # Shelf packing: sprites fill a row left to right, the next row
+        # starts below the tallest one
+        self._x = self._y = self._shelf = 0
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def sprite(self, key):
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self._add(key)
+        return sprite
+
+    def blits(self, screen, items):
+        # items: (key, (x, y)) pairs in game coordinates. One blits() call;
+        # returns the rects covered, in screen coordinates.
+        sprite, scale = self.sprite, self.scale
+        batch = []
+        for key, (x, y) in items:
+            page, area = sprite(key)
+            if scale != 1:
+                x, y = round(x * scale), round(y * scale)
+            batch.append((page, (x, y), area))
+        return screen.blits(batch)
+
+    def draw(self, screen, entities, alpha=1.0):
+        return self.blits(screen, [(entity.sprite_key(), entity.topleft(alpha)) for entity in entities])
+
+    def _add(self, key):
+        width, height = round(key[1] * self.scale), round(key[2] * self.scale)
+        page, area = self._allocate(width, height)
+        PAINTERS[key[0]](page.subsurface(area), self.scale, *key[3:])
+        return page, area
+
+    def _allocate(self, width, height):
+        page_width, page_height = PAGE_SIZE
+        if not self.pages or self._x + width > page_width:
+            self._x, self._y, self._shelf = 0, self._y + self._shelf, 0
+        if not self.pages or self._y + height > page_height:
+            self.pages.append(_page(max(width, page_width), max(height, page_height)))
+            self._x = self._y = self._shelf = 0
+        area = pygame.Rect(self._x, self._y, width, height)
+        self._x += width
+        self._shelf = max(self._shelf, height)
+        return self.pages[-1], area
+
+
+def _page(width, height):
+    page = pygame.Surface((width, height))
+    if pygame.display.get_surface() is not None:
+        page = page.convert()
+    page.fill(COLORKEY)
+    page.set_colorkey(COLORKEY, pygame.RLEACCEL)
+    return page
+
+
+def _paint_rect(surface, scale, color):
+    surface.fill(color)
+
+
+def _paint_power_up(surface, scale, color, char):
+    rect = surface.get_rect()
+    pygame.draw.rect(surface, color, rect, border_radius=round(4 * scale))
+    text = render_text(ASSETS.font(round(POWERUP_FONT_SIZE * scale)), char, (0, 0, 0))
+    surface.blit(text, text.get_rect(center=rect.center))
+
+
+PAINTERS = {RECT: _paint_rect, POWER_UP: _paint_power_up}
+
+# The game's own atlas, at 1:1
+ATLAS = SpriteAtlas()
+# !!! END PHASE: SPRITE ATLAS !!!
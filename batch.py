@@ -0,0 +1,134 @@
+import argparse
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from engine import GameState, POWER_UP_DROP_CHANCE
+
+# !!! PHASE: BATCH EVALUATION !!!
+# Plays many seeded games with an autoplay policy, spread over all cores.
+# Every game is independent and headless, so the work splits cleanly across
+# worker processes and only a small stats dict travels back per game.
+
+DEFAULT_MAX_FRAMES = 60 * 60 * 10
+
+
+def load_policy(name):
+    # 'track_ball' (from policies.py) or 'some.module:function'
+    module_name, _, attr = name.rpartition(':')
+    return getattr(importlib.import_module(module_name or 'policies'), attr)
+
+
+def play_game(policy, seed, max_frames=DEFAULT_MAX_FRAMES, drop_chance=POWER_UP_DROP_CHANCE):
+    state = GameState(seed=seed, drop_chance=drop_chance)
+    lives_lost = bricks_broken = power_ups = 0
+    step = state.step
+    while state.status == 'playing' and state.frame < max_frames:
+        for event, _ in step(policy(state)):
+            if event == 'brick_break':
+                bricks_broken += 1
+            elif event in ('life_lost', 'game_over'):
+                lives_lost += 1
+            elif event == 'power_up':
+                power_ups += 1
+    return {
+        'seed': seed,
+        'score': state.score,
+        'level': state.level,
+        'lives_lost': lives_lost,
+        'frames': state.frame,
+        'bricks_broken': bricks_broken,
+        'power_ups_caught': power_ups,
+        'finished': state.status != 'playing',
+    }
+
+
+def _play_named(policy_name, max_frames, drop_chance, seed):
+    return play_game(load_policy(policy_name), seed, max_frames, drop_chance)
+
+
+def evaluate(policy_name, games, first_seed=0, workers=None, max_frames=DEFAULT_MAX_FRAMES,
+             drop_chance=POWER_UP_DROP_CHANCE):
+    # The policy is passed by name and imported in each worker, so any
+    # module-level function works, including ones defined outside this repo.
+    workers = workers or os.cpu_count() or 1
+    seeds = range(first_seed, first_seed + games)
+    play = partial(_play_named, policy_name, max_frames, drop_chance)
+    if workers == 1:
+        return [play(seed) for seed in seeds]
+    # Few big chunks keep inter-process traffic negligible next to the games
+    chunksize = max(1, games // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(play, seeds, chunksize=chunksize))
+
+
+def summarize(results):
+    scores = np.array([r['score'] for r in results])
+    levels = np.array([r['level'] for r in results])
+    lives_lost = np.array([r['lives_lost'] for r in results])
+    frames = sum(r['frames'] for r in results)
+    bricks = sum(r['bricks_broken'] for r in results)
+    return {
+        'games': len(results),
+        'score': {
+            'mean': float(scores.mean()), 'std': float(scores.std()),
+            'min': int(scores.min()), 'p25': float(np.percentile(scores, 25)),
+            'p50': float(np.percentile(scores, 50)), 'p75': float(np.percentile(scores, 75)),
+            'max': int(scores.max()),
+        },
+        'level': {int(level): int(count) for level, count in zip(*np.unique(levels, return_counts=True))},
+        'lives_lost_mean': float(lives_lost.mean()),
+        'frames_per_brick': frames / bricks if bricks else float('inf'),
+        'frames': frames,
+        'unfinished': sum(not r['finished'] for r in results),
+    }
+
+
+def print_summary(summary, elapsed):
+    score = summary['score']
+    print(f"{summary['games']} games, {summary['frames']:,} frames in {elapsed:.2f}s "
+          f"({summary['frames'] / elapsed:,.0f} frames/s)")
+    print(f"score  mean {score['mean']:.1f} +- {score['std']:.1f}  min {score['min']}  "
+          f"p25 {score['p25']:.0f}  p50 {score['p50']:.0f}  p75 {score['p75']:.0f}  max {score['max']}")
+    print("level reached  " + "  ".join(f"{level}: {count}" for level, count in summary['level'].items()))
+    print(f"lives lost per game {summary['lives_lost_mean']:.2f}, "
+          f"frames per brick {summary['frames_per_brick']:.1f}, "
+          f"hit the frame limit {summary['unfinished']}")
+# !!! END PHASE: BATCH EVALUATION !!!
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play seeded games with an autoplay policy on all cores")
+    parser.add_argument('--policy', default='track_ball', help="policies.py function or module:function")
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('--workers', type=int, default=None, help="default: all cores")
+    parser.add_argument('--max-frames', type=int, default=DEFAULT_MAX_FRAMES)
+    parser.add_argument('--drop-chance', type=float, default=POWER_UP_DROP_CHANCE)
+    parser.add_argument('--scaling', action='store_true', help="time 1, 2, 4 ... workers up to all cores")
+    args = parser.parse_args()
+    load_policy(args.policy)  # fail early on a bad name
+
+    if args.scaling:
+        cores = os.cpu_count() or 1
+        counts = sorted({1, cores} | {2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores})
+        single = None
+        for workers in counts:
+            start = time.perf_counter()
+            evaluate(args.policy, args.games, args.seed, workers, args.max_frames, args.drop_chance)
+            elapsed = time.perf_counter() - start
+            single = single or elapsed
+            print(f"{workers:3d} workers: {elapsed:7.2f}s  speedup {single / elapsed:5.2f}x")
+        return
+
+    start = time.perf_counter()
+    results = evaluate(args.policy, args.games, args.seed, args.workers, args.max_frames, args.drop_chance)
+    print_summary(summarize(results), time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# Measures how many frames per second the headless engine can simulate.
+# Run from the repository root: python -m benchmarks.engine_throughput
+import argparse
+import time
+
+from engine import GameState
+from policies import track_ball
+
+
+def run(frames, seed=0):
+    state = GameState(seed=seed)
+    games = 1
+    start = time.perf_counter()
+    for _ in range(frames):
+        state.step(track_ball(state))
+        if state.status != 'playing':
+            state.reset(seed + games)
+            games += 1
+    elapsed = time.perf_counter() - start
+    return elapsed, games, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless engine throughput")
+    parser.add_argument('--frames', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    elapsed, games, state = run(args.frames, args.seed)
+    print(f"{args.frames} frames in {elapsed:.2f}s: {args.frames / elapsed:,.0f} simulated frames/s "
+          f"({args.frames / elapsed / 60:,.0f}x real time)")
+    print(f"games: {games}, last game level {state.level}, score {state.score}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# Level-pack load times: opening a pack and starting a level from it,
+# against generating a wall with create_brick_wall and parsing the text
+# format. Run from the repository root:
+#   python -m benchmarks.levelpack --levels 5000
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from engine import create_brick_wall
+from levelpack import DEFAULT_LAYOUT, DEFAULT_PALETTE, NORMAL, STEEL, Level, LevelPack, pack_bytes, parse_text
+
+
+def random_level(rng, number):
+    bricks = []
+    for row in range(rng.randint(4, 20)):
+        for col in range(10):
+            roll = rng.random()
+            if roll < 0.15:
+                continue
+            if roll < 0.2:
+                bricks.append((col, row, STEEL, 0, 4))
+            else:
+                bricks.append((col, row, NORMAL, rng.randint(1, 3), row % 4))
+    return Level(f"Level {number + 1}", DEFAULT_LAYOUT, bricks)
+
+
+def as_text(levels):
+    lines = []
+    for level in levels:
+        lines.append(f"level {level.name}")
+        rows = {}
+        for col, row, kind, hit_points, color in level.bricks:
+            rows.setdefault(row, ['..'] * 10)[col] = ('S' if kind == STEEL else str(hit_points)) + str(color)
+        for row in range(max(rows) + 1):
+            lines.append(' '.join(rows.get(row, ['..'] * 10)))
+    return '\n'.join(lines)
+
+
+def timed(function, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), max(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Level-pack load benchmark")
+    parser.add_argument('--levels', type=int, default=5000, help="levels in the generated pack")
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    levels = [random_level(rng, number) for number in range(args.levels)]
+    text = as_text(levels)
+    start = time.perf_counter()
+    data = pack_bytes(levels, DEFAULT_PALETTE)
+    compile_ms = (time.perf_counter() - start) * 1000
+    bricks = sum(len(level.bricks) for level in levels)
+    print(f"{args.levels} levels, {bricks:,} bricks: pack {len(data) / 1024:,.0f} KiB "
+          f"({len(data) / bricks:.1f} bytes per brick), text {len(text) / 1024:,.0f} KiB, "
+          f"packed in {compile_ms:.0f} ms")
+
+    fd, path = tempfile.mkstemp(suffix='.arkl')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    try:
+        pack = LevelPack(path)
+        cases = [
+            ("open pack (mmap)", lambda: LevelPack(path).close()),
+            ("build random level", lambda: pack.build(rng.randrange(len(pack)))),
+            ("decode random level", lambda: pack.level(rng.randrange(len(pack)))),
+            ("create_brick_wall(20)", lambda: create_brick_wall(20)),
+        ]
+        print(f"{'case':24} {'median':>9} {'max':>9}  (ms)")
+        for name, function in cases:
+            median, worst = timed(function, args.runs)
+            print(f"{name:24} {median:9.3f} {worst:9.3f}")
+        median, worst = timed(lambda: parse_text(text), 3)
+        print(f"{'parse whole text file':24} {median:9.3f} {worst:9.3f}")
+        pack.close()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
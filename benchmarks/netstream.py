@@ -0,0 +1,87 @@
+# Streams a headless game to spectators over localhost and reports bytes per
+# step (against sending the full state every step) and the time from
+# publishing a step to its acknowledgement. Run from the repository root:
+#   python -m benchmarks.netstream --steps 3000 --clients 2
+import argparse
+import asyncio
+import time
+
+from engine import GameState
+from netstream import Frame, StateClient, StateEncoder, StateServer
+from policies import track_ball_and_fire
+
+
+async def spectate(client, steps, received):
+    while True:
+        state = await client.receive()
+        received.append(state)
+        if state.tick >= steps:
+            return
+
+
+def matches(remote, state):
+    bricks = {order: brick.hit_points for brick, order in state.bricks._order.items()}
+    return (remote.score == state.score and remote.lives == state.lives and remote.level == state.level
+            and remote.paddle == (state.paddle.rect.x, state.paddle.width)
+            and remote.balls == [ball.rect.center for ball in state.balls]
+            and remote.lasers == [laser.rect.topleft for laser in state.lasers]
+            and remote.bricks == bricks)
+
+
+async def run(steps, clients, rate, seed, balls):
+    server = StateServer(port=0)
+    await server.start()
+    spectators = [StateClient() for _ in range(clients)]
+    for client in spectators:
+        await client.connect('127.0.0.1', server.port)
+    while server.clients < clients:
+        await asyncio.sleep(0.001)
+    received = [[] for _ in spectators]
+    tasks = [asyncio.create_task(spectate(client, steps, states)) for client, states in zip(spectators, received)]
+
+    state = GameState(seed=seed)
+    state.add_balls(balls)
+    full_sizes = []
+    start = time.perf_counter()
+    for step in range(steps):
+        if state.status != 'playing':
+            state.reset(seed + step)
+            state.add_balls(balls)
+        state.step(track_ball_and_fire(state))
+        server.publish(state)
+        # What the same step would cost with no baseline
+        full_sizes.append(len(StateEncoder().encode(Frame(0, server.frame.snapshot, 0))))
+        if rate:
+            await asyncio.sleep(max(0.0, start + (step + 1) / rate - time.perf_counter()))
+        else:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    in_sync = all(matches(states[-1], state) for states in received)
+    for client in spectators:
+        client.close()
+    await server.aclose()
+    return server.stats(), full_sizes, elapsed, in_sync
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta-compressed state streaming over localhost")
+    parser.add_argument('--steps', type=int, default=3000)
+    parser.add_argument('--clients', type=int, default=2)
+    parser.add_argument('--rate', type=int, default=60, help="steps per second, 0 for as fast as possible")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--balls', type=int, default=0, help="extra balls in play")
+    args = parser.parse_args()
+
+    stats, full_sizes, elapsed, in_sync = asyncio.run(run(args.steps, args.clients, args.rate, args.seed, args.balls))
+    full = sum(full_sizes) / len(full_sizes)
+    rate = args.rate or args.steps / elapsed
+    print(f"{stats['frames']} messages to {args.clients} client(s) in {elapsed:.2f}s, "
+          f"clients in sync at the end: {in_sync}")
+    print(f"  bytes per step: {stats['mean_bytes']:.1f} mean, {stats['p99_bytes']} p99 "
+          f"(full state: {full:.1f}), {stats['mean_bytes'] * rate * 8 / 1000:.1f} kbit/s per client at {rate:.0f} steps/s")
+    print(f"  publish to acknowledgement: {stats['p50_latency_ms']:.2f} ms p50, {stats['p99_latency_ms']:.2f} ms p99")
+
+
+if __name__ == '__main__':
+    main()
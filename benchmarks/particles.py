@@ -0,0 +1,48 @@
+# Update + draw cost of the particle engine with many live particles.
+# Run from the repository root: python -m benchmarks.particles
+import argparse
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+from particles import ParticleSystem
+
+BRICK_PARTICLE_COLORS = [(135, 206, 250), (255, 255, 255), (186, 85, 211)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Particle engine frame cost")
+    parser.add_argument('--particles', type=int, default=20000)
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    particles = ParticleSystem(seed=0)
+    # Keep the population steady: top up what died in the previous frame
+    burst = 10
+    update_time = draw_time = 0.0
+    for _ in range(args.frames):
+        missing = args.particles - len(particles)
+        while missing > 0:
+            particles.emit(min(burst, missing), 400, 300, BRICK_PARTICLE_COLORS, 1, 3, 1, 3, 0.05)
+            missing -= burst
+        start = time.perf_counter()
+        particles.update()
+        update_time += time.perf_counter() - start
+        start = time.perf_counter()
+        screen.fill((10, 10, 30))
+        particles.draw(screen)
+        draw_time += time.perf_counter() - start
+
+    frames = args.frames
+    print(f"{args.particles} live particles, {frames} frames")
+    print(f"update: {update_time / frames * 1000:.3f} ms/frame")
+    print(f"draw:   {draw_time / frames * 1000:.3f} ms/frame")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
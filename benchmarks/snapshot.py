@@ -0,0 +1,114 @@
+# Snapshot and restore costs, and a check that a restored game plays on
+# exactly like the original. Run from the repository root:
+#   python -m benchmarks.snapshot --frames 20000 --balls 0
+import argparse
+import random
+import statistics
+import time
+
+from engine import GameState
+from policies import track_ball_and_fire
+
+
+def fingerprint(state):
+    return (state.frame, state.score, state.lives, state.level, state.status, len(state.bricks),
+            tuple((ball.x, ball.y, ball.speed_x, ball.speed_y) for ball in state.balls),
+            tuple((power_up.type, power_up.y) for power_up in state.power_ups),
+            tuple(laser.y for laser in state.lasers), state.rng.random())
+
+
+def play(state, frames):
+    for _ in range(frames):
+        if state.status != 'playing':
+            break
+        state.step(track_ball_and_fire(state))
+
+
+def check(seed, frames, balls):
+    # Snapshots every 100 frames of one game, then every one of them
+    # restored in shuffled order (so most restores change level) and played
+    # to the end again: each must end exactly where the original did
+    state = GameState(seed=seed)
+    state.add_balls(balls)
+    snapshots = []
+    for frame in range(frames):
+        if state.status != 'playing':
+            break
+        if frame % 100 == 0:
+            snapshots.append(state.snapshot())
+        state.step(track_ball_and_fire(state))
+    end = state.frame
+    expected = fingerprint(state)
+    random.Random(seed).shuffle(snapshots)
+    mismatches = 0
+    for snapshot in snapshots:
+        state.restore(snapshot)
+        play(state, end - state.frame)
+        mismatches += fingerprint(state) != expected
+    return len(snapshots), mismatches, state.level
+
+
+def timings(seed, frames, balls, rollback):
+    state = GameState(seed=seed)
+    state.add_balls(balls)
+    take, same, back, search = [], [], [], 0
+    history = []
+    search_start = time.perf_counter()
+    perf = time.perf_counter
+    for _ in range(frames):
+        if state.status != 'playing':
+            state.reset(seed)
+            state.add_balls(balls)
+            history.clear()
+        start = perf()
+        snapshot = state.snapshot()
+        take.append(perf() - start)
+        history.append(snapshot)
+
+        # Nothing changed since: the restore is pure copying
+        start = perf()
+        state.restore(snapshot)
+        same.append(perf() - start)
+
+        # Rollback: rewind a few steps and play them again
+        if len(history) > rollback:
+            start = perf()
+            state.restore(history[-rollback - 1])
+            back.append(perf() - start)
+            play(state, rollback)
+            search += rollback
+        del history[:-rollback - 1]
+        state.step(track_ball_and_fire(state))
+    elapsed = time.perf_counter() - search_start
+    return take, same, back, elapsed, search
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    mean = statistics.fmean(samples)
+    print(f"  {name:<22} {mean * 1e6:8.1f} us mean {samples[len(samples) * 99 // 100] * 1e6:8.1f} us p99 "
+          f"{1 / mean:>10,.0f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Game state snapshot and restore")
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--balls', type=int, default=0, help="extra balls in play")
+    parser.add_argument('--rollback', type=int, default=8, help="steps rewound and replayed each frame")
+    args = parser.parse_args()
+
+    count, mismatches, level = check(args.seed, args.frames, args.balls)
+    print(f"{count} snapshots restored up to level {level}: {mismatches} replays differ from the original")
+
+    take, same, back, elapsed, search = timings(args.seed, args.frames, args.balls, args.rollback)
+    print(f"{args.frames} frames with {args.balls + 1} ball(s) in play:")
+    report("snapshot", take)
+    report("restore (unchanged)", same)
+    report(f"restore ({args.rollback} steps back)", back)
+    print(f"  rollback play: {args.frames + search} steps and {len(take) + len(same) + len(back):,} snapshots "
+          f"and restores in {elapsed:.2f}s ({args.frames / elapsed:,.0f} frames/s)")
+
+
+if __name__ == '__main__':
+    main()
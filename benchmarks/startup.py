@@ -0,0 +1,76 @@
+# Time from process start to the first presented frame, and the import cost
+# of the headless engine. Also checks that main.py leaves the modules of its
+# optional modes unimported and that headless games load no fonts or sounds,
+# and fails if the first frame takes longer than --budget. Run from the
+# repository root:
+#   python -m benchmarks.startup --budget 400
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Only imported when --levels, --record/--replay or --serve ask for them
+OPTIONAL_MODULES = ('levelpack', 'replay', 'netstream')
+# A headless game, as batch.py and replay.py play them
+HEADLESS_GAME = '''
+import pygame
+from engine import GameState
+state = GameState(seed=1)
+for _ in range(600):
+    state.step()
+print(pygame.font.get_init(), bool(pygame.mixer.get_init()))
+'''
+
+
+def timed_run(command, env):
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return (time.perf_counter() - start) * 1000, result.stdout
+
+
+def imported_modules(command, env):
+    # Top-level names of every module `command` imports, from -X importtime
+    result = subprocess.run([command[0], '-X', 'importtime'] + command[1:], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return {line.rpartition('|')[2].strip().split('.')[0]
+            for line in result.stderr.splitlines() if line.startswith('import time:')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, metavar='MS', help="fail if the first frame takes longer")
+    args = parser.parse_args()
+
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    cases = [
+        ("python interpreter", [sys.executable, '-c', 'pass']),
+        ("import engine (headless)", [sys.executable, '-c', 'import engine']),
+        ("main.py to first frame", [sys.executable, 'main.py', '--startup-time']),
+    ]
+    first_frame = None
+    for label, command in cases:
+        times = [timed_run(command, env)[0] for _ in range(args.runs)]
+        first_frame = statistics.median(times)
+        print(f"{label:26} median {statistics.median(times):7.1f} ms  min {min(times):7.1f} ms")
+
+    problems = []
+    eager = imported_modules(cases[-1][1], env).intersection(OPTIONAL_MODULES)
+    if eager:
+        problems.append(f"main.py imports {', '.join(sorted(eager))} without the options that need them")
+    fonts, audio = timed_run([sys.executable, '-c', HEADLESS_GAME], env)[1].split()
+    if fonts != 'False' or audio != 'False':
+        problems.append(f"a headless game started fonts ({fonts}) or audio ({audio})")
+    if args.budget is not None and first_frame > args.budget:
+        problems.append(f"first frame after {first_frame:.1f} ms, over the {args.budget:.0f} ms budget")
+    for problem in problems:
+        print("FAIL", problem)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
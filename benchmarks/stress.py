@@ -0,0 +1,271 @@
+# Frame-time benchmark over fixed-seed stress scenarios.
+# Run from the repository root:
+#   python -m benchmarks.stress --output results.json
+#   python -m benchmarks.stress --baseline results.json
+import argparse
+import json
+import os
+import platform
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+import numpy as np
+import pygame
+
+from atlas import ATLAS
+from engine import GameState, POWER_UP_TYPES
+from game_objects import POWER_UPS, Firework
+from particles import ParticleSystem
+from policies import track_ball
+from starfield import Starfield, MeteorShower
+from pool import pool_stats
+
+WIDTH, HEIGHT = 800, 600
+BG_COLOR = (10, 10, 30)
+BRICK_PARTICLE_COLORS = [(135, 206, 250), (255, 255, 255), (186, 85, 211)]
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+# Each scenario setup returns an (update, draw) pair of callables.
+
+@scenario('level_20')
+def level_20(seed):
+    state = GameState(WIDTH, HEIGHT, seed=seed)
+    state.start_level(20)
+
+    def update():
+        state.step(track_ball(state))
+        if state.status != 'playing':
+            state.reset(state.seed + 1)
+            state.start_level(20)
+
+    def draw(screen):
+        ATLAS.draw(screen, state.bricks)
+        state.paddle.draw(screen)
+        for ball in state.balls:
+            ball.draw(screen)
+        ATLAS.draw(screen, state.power_ups)
+        ATLAS.draw(screen, state.lasers)
+    return update, draw
+
+
+@scenario('laser_storm')
+def laser_storm(seed):
+    # A volley every frame for the whole run
+    state = GameState(WIDTH, HEIGHT, seed=seed)
+    state.start_level(20)
+
+    def update():
+        state.paddle.activate_power_up('laser')
+        state.step(track_ball(state)._replace(fire=True))
+        if state.status != 'playing':
+            state.reset(state.seed + 1)
+
+    def draw(screen):
+        ATLAS.draw(screen, state.bricks)
+        state.paddle.draw(screen)
+        for ball in state.balls:
+            ball.draw(screen)
+        ATLAS.draw(screen, state.lasers)
+    return update, draw
+
+
+@scenario('balls_300')
+def balls_300(seed):
+    # Multi-ball stress mode: 300 balls over a level 20 wall
+    state = GameState(WIDTH, HEIGHT, seed=seed)
+
+    def start():
+        state.start_level(20)
+        state.add_balls(299)
+
+    def update():
+        if len(state.balls) < 150 or state.status != 'playing':
+            state.reset(state.seed + 1)
+            start()
+        state.step(track_ball(state))
+
+    def draw(screen):
+        ATLAS.draw(screen, state.bricks)
+        state.paddle.draw(screen)
+        for ball in state.balls:
+            ball.draw(screen)
+    start()
+    return update, draw
+
+
+@scenario('particles_5000')
+def particles_5000(seed):
+    particles = ParticleSystem(seed=seed)
+
+    def update():
+        # Top up to 5,000 with brick-break sized bursts
+        while len(particles) < 5000:
+            x, y = random.randint(0, WIDTH), random.randint(0, HEIGHT // 2)
+            particles.emit(10, x, y, BRICK_PARTICLE_COLORS, 1, 3, 1, 3, 0.05)
+        particles.update()
+    return update, particles.draw
+
+
+@scenario('fireworks_30')
+def fireworks_30(seed):
+    fireworks = []
+
+    def update():
+        fireworks[:] = [firework for firework in fireworks if not firework.is_dead()]
+        while len(fireworks) < 30:
+            fireworks.append(Firework(WIDTH, HEIGHT))
+        for firework in fireworks:
+            firework.update()
+
+    def draw(screen):
+        for firework in fireworks:
+            firework.draw(screen)
+    return update, draw
+
+
+@scenario('meteors_200')
+def meteors_200(seed):
+    meteors = MeteorShower(WIDTH, HEIGHT, spawn_chance=0, capacity=256, seed=seed)
+
+    def update():
+        while len(meteors) < 200:
+            meteors.spawn()
+        meteors.update()
+    return update, meteors.draw
+
+
+@scenario('menu')
+def menu(seed):
+    # Title screen background
+    starfield = Starfield(WIDTH, HEIGHT, BG_COLOR, seed=seed)
+    meteors = MeteorShower(WIDTH, HEIGHT, seed=seed)
+
+    def update():
+        starfield.update()
+        meteors.update()
+
+    def draw(screen):
+        starfield.draw(screen)
+        meteors.draw(screen)
+    return update, draw
+
+
+@scenario('power_ups_300')
+def power_ups_300(seed):
+    power_ups = []
+
+    def update():
+        for power_up in power_ups:
+            if power_up.rect.top > HEIGHT:
+                POWER_UPS.release(power_up)
+        power_ups[:] = [power_up for power_up in power_ups if power_up.rect.top <= HEIGHT]
+        while len(power_ups) < 300:
+            power_ups.append(POWER_UPS.acquire(random.randint(0, WIDTH - 30), random.randint(-HEIGHT, HEIGHT),
+                                               random.choice(POWER_UP_TYPES)))
+        for power_up in power_ups:
+            power_up.update()
+
+    def draw(screen):
+        ATLAS.draw(screen, power_ups)
+    return update, draw
+
+
+def percentiles(samples):
+    ms = np.array(samples) * 1000
+    return {
+        'mean': round(float(ms.mean()), 4),
+        'p50': round(float(np.percentile(ms, 50)), 4),
+        'p95': round(float(np.percentile(ms, 95)), 4),
+        'p99': round(float(np.percentile(ms, 99)), 4),
+    }
+
+
+def run_scenario(setup, screen, frames, warmup, seed):
+    random.seed(seed)
+    update, draw = setup(seed)
+    update_times, draw_times = [], []
+    for frame in range(warmup + frames):
+        start = time.perf_counter()
+        update()
+        middle = time.perf_counter()
+        screen.fill(BG_COLOR)
+        draw(screen)
+        end = time.perf_counter()
+        if frame >= warmup:
+            update_times.append(middle - start)
+            draw_times.append(end - middle)
+    return {'update_ms': percentiles(update_times), 'draw_ms': percentiles(draw_times)}
+
+
+def compare(results, baseline):
+    print("\nvs baseline (p95, lower is better):")
+    for name, result in results['scenarios'].items():
+        previous = baseline['scenarios'].get(name)
+        if not previous:
+            print(f"  {name:16} (not in baseline)")
+            continue
+        for phase in ('update_ms', 'draw_ms'):
+            now, before = result[phase]['p95'], previous[phase]['p95']
+            ratio = now / before if before else float('inf')
+            print(f"  {name:16} {phase:10} {before:8.3f} -> {now:8.3f} ms  ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame-time stress benchmarks")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--warmup', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--only', nargs='*', choices=sorted(SCENARIOS), help="scenarios to run")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'frames': args.frames,
+            'seed': args.seed,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'scenarios': {},
+    }
+
+    print(f"{'scenario':16} {'phase':10} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for name in args.only or SCENARIOS:
+        result = run_scenario(SCENARIOS[name], screen, args.frames, args.warmup, args.seed)
+        results['scenarios'][name] = result
+        for phase in ('update_ms', 'draw_ms'):
+            stats = result[phase]
+            print(f"{name:16} {phase:10} {stats['p50']:8.3f} {stats['p95']:8.3f} {stats['p99']:8.3f}")
+    results['pools'] = pool_stats()
+    print("\nobject pools: " + ", ".join(f"{name} {stats['allocated']} allocated / {stats['reused']} reused"
+                                        for name, stats in results['pools'].items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
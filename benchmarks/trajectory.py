@@ -0,0 +1,119 @@
+# Checks trajectory.predict() against stepping Ball.update() and compares
+# their cost per query. Run from the repository root:
+#   python -m benchmarks.trajectory --balls 2000
+import argparse
+import math
+import random
+import time
+
+from engine import SCREEN_WIDTH, SCREEN_HEIGHT, create_brick_wall
+from game_objects import Ball, Paddle
+from trajectory import predict
+
+
+def random_ball(rng, top):
+    ball = Ball(SCREEN_WIDTH, SCREEN_HEIGHT, rng)
+    ball.x = rng.uniform(ball.radius, SCREEN_WIDTH - ball.radius)
+    ball.y = rng.uniform(top + ball.radius + 1, 520)
+    speed = ball.base_speed * rng.choice((1, 1.5, 2.25))
+    angle = math.radians(rng.uniform(20, 160)) * rng.choice((1, -1))
+    ball.speed_x, ball.speed_y = speed * math.cos(angle), speed * math.sin(angle)
+    if rng.random() < 0.2:
+        ball.speed_x /= 2
+        ball.speed_y /= 2
+        ball.is_slowed = True
+        ball.slow_timer = rng.randint(1, 120)
+    return ball
+
+
+def step_to_line(ball, line_y, bricks, paddle, limit=10000):
+    # Steps frame by frame: (x, frames) at the line, or (brick, frame) of
+    # the first brick hit
+    for frame in range(1, limit):
+        x, y, speed_x, speed_y = ball.x, ball.y, ball.speed_x, ball.speed_y
+        is_slowed, slow_timer = ball.is_slowed, ball.slow_timer
+        ball.update(paddle, False, bricks)
+        if ball.bricks_hit:
+            return ball.bricks_hit[0], frame
+        if ball.y >= line_y:
+            # Redo the last frame only as far as the line
+            ball.x, ball.y, ball.speed_x, ball.speed_y = x, y, speed_x, speed_y
+            ball.is_slowed, ball.slow_timer = is_slowed, slow_timer
+            if is_slowed and slow_timer <= 1:
+                # The whole frame moved at the restored speed
+                ball.speed_x, ball.speed_y, ball.is_slowed = speed_x * 2, speed_y * 2, False
+            low, high = 0.0, 1.0
+            for _ in range(40):
+                middle = (low + high) / 2
+                probe = ball_copy(ball)
+                probe.update(paddle, False, bricks, middle)
+                low, high = (middle, high) if probe.y < line_y else (low, middle)
+            probe = ball_copy(ball)
+            probe.update(paddle, False, bricks, high)
+            return probe.x, frame - 1 + high
+    return None, limit
+
+
+def frames_to_line(ball, line_y, paddle):
+    # What a bot has to do without a predictor
+    frames = 0
+    while ball.y < line_y:
+        ball.update(paddle)
+        frames += 1
+    return ball.x, frames
+
+
+def ball_copy(ball):
+    copy = ball.split(0)
+    copy.speed_x, copy.speed_y = ball.speed_x, ball.speed_y
+    return copy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytic ball trajectory prediction")
+    parser.add_argument('--balls', type=int, default=2000)
+    parser.add_argument('--level', type=int, default=5, help="brick wall to predict through")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    paddle = Paddle(SCREEN_WIDTH, SCREEN_HEIGHT)
+    paddle.rect.x = -10000
+    line_y = paddle.rect.top - Ball(SCREEN_WIDTH, SCREEN_HEIGHT).radius
+    bricks = create_brick_wall(args.level)
+    balls = [random_ball(rng, bricks.bounds.bottom) for _ in range(args.balls)]
+
+    start = time.perf_counter()
+    predictions = [predict(ball, line_y) for ball in balls]
+    walls_only = time.perf_counter() - start
+    start = time.perf_counter()
+    with_bricks = [predict(ball, line_y, bricks) for ball in balls]
+    through_bricks = time.perf_counter() - start
+
+    copies = [ball_copy(ball) for ball in balls]
+    start = time.perf_counter()
+    stepped_frames = sum(frames_to_line(ball, line_y, paddle)[1] for ball in copies)
+    stepping = time.perf_counter() - start
+
+    x_error = time_error = 0.0
+    brick_misses = 0
+    for ball, prediction, blocked in zip(balls, predictions, with_bricks):
+        x, frames = step_to_line(ball_copy(ball), line_y, None, paddle)
+        x_error = max(x_error, abs(x - prediction.x))
+        time_error = max(time_error, abs(frames - prediction.time))
+        brick, frame = step_to_line(ball_copy(ball), line_y, bricks, paddle)
+        if blocked.brick is not None or not isinstance(brick, float):
+            brick_misses += brick is not blocked.brick or math.ceil(blocked.brick_time) != frame
+
+    bounces = sum(prediction.bounces for prediction in predictions) / len(predictions)
+    blocked_count = sum(prediction.brick is not None for prediction in with_bricks)
+    print(f"{args.balls} balls, {bounces:.1f} wall bounces and {stepped_frames / args.balls:.0f} frames to the paddle on average")
+    print(f"  landing x error {x_error:.2e} px, time error {time_error:.2e} frames against stepping")
+    print(f"  first brick on level {args.level}: {blocked_count} balls blocked, {brick_misses} disagree with stepping")
+    print(f"  predict, walls only:  {walls_only / args.balls * 1e6:8.1f} us per query")
+    print(f"  predict, with bricks: {through_bricks / args.balls * 1e6:8.1f} us per query")
+    print(f"  stepping Ball.update: {stepping / args.balls * 1e6:8.1f} us per query (walls only)")
+
+
+if __name__ == '__main__':
+    main()
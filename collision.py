@@ -0,0 +1,100 @@
+import math
+
+# !!! PHASE: SWEPT COLLISION !!!
+# Continuous collision for a moving circle. Instead of moving first and
+# checking overlap afterwards (which lets a fast ball skip through a 20px
+# brick), each test returns the time of impact along the move, as a fraction
+# 0..1 of (dx, dy), and the unit normal of the face that was hit.
+
+
+def sweep_circle_rect(x, y, radius, dx, dy, rect):
+    # A circle against a rect is a point against the rect grown by the
+    # radius with rounded corners: slab test first, then the corner circles.
+    left, right = rect.left - radius, rect.right + radius
+    top, bottom = rect.top - radius, rect.bottom + radius
+
+    if dx:
+        t1, t2 = (left - x) / dx, (right - x) / dx
+        tx_enter, tx_exit = min(t1, t2), max(t1, t2)
+    elif left < x < right:
+        tx_enter, tx_exit = -math.inf, math.inf
+    else:
+        return None
+    if dy:
+        t1, t2 = (top - y) / dy, (bottom - y) / dy
+        ty_enter, ty_exit = min(t1, t2), max(t1, t2)
+    elif top < y < bottom:
+        ty_enter, ty_exit = -math.inf, math.inf
+    else:
+        return None
+
+    t_enter = max(tx_enter, ty_enter)
+    t_exit = min(tx_exit, ty_exit)
+    if t_enter > t_exit or t_exit <= 0 or t_enter > 1:
+        return None
+
+    inside = t_enter < 0
+    t = 0.0 if inside else t_enter
+    px, py = x + dx * t, y + dy * t
+
+    outside_x = px < rect.left or px > rect.right
+    outside_y = py < rect.top or py > rect.bottom
+    if outside_x and outside_y:
+        corner_x = rect.left if px < rect.left else rect.right
+        corner_y = rect.top if py < rect.top else rect.bottom
+        return _sweep_corner(x, y, radius, dx, dy, corner_x, corner_y)
+
+    if inside:
+        # Already overlapping: push out along the axis of least penetration
+        penetration = [(x - left, -1.0, 0.0), (right - x, 1.0, 0.0),
+                       (y - top, 0.0, -1.0), (bottom - y, 0.0, 1.0)]
+        _, nx, ny = min(penetration)
+        return 0.0, nx, ny
+    if tx_enter > ty_enter:
+        return t, (-1.0 if dx > 0 else 1.0), 0.0
+    return t, 0.0, (-1.0 if dy > 0 else 1.0)
+
+
+def _sweep_corner(x, y, radius, dx, dy, corner_x, corner_y):
+    ox, oy = x - corner_x, y - corner_y
+    c = ox * ox + oy * oy - radius * radius
+    if c <= 0:
+        distance = math.hypot(ox, oy) or 1.0
+        return 0.0, ox / distance, oy / distance
+    a = dx * dx + dy * dy
+    b = 2 * (ox * dx + oy * dy)
+    discriminant = b * b - 4 * a * c
+    if not a or discriminant < 0:
+        return None
+    t = (-b - math.sqrt(discriminant)) / (2 * a)
+    if not 0 <= t <= 1:
+        return None
+    return t, (ox + dx * t) / radius, (oy + dy * t) / radius
+
+
+def sweep_circle_walls(x, y, radius, dx, dy, width):
+    # Left, right and top walls of the play field; the bottom is open.
+    # Returns the earliest (t, nx, ny) or None.
+    best = None
+    if dx < 0:
+        best = _earliest(best, (radius - x) / dx, 1.0, 0.0)
+    elif dx > 0:
+        best = _earliest(best, (width - radius - x) / dx, -1.0, 0.0)
+    if dy < 0:
+        best = _earliest(best, (radius - y) / dy, 0.0, 1.0)
+    return best
+
+
+def _earliest(best, t, nx, ny):
+    if t > 1:
+        return best
+    t = max(t, 0.0)
+    if best is None or t < best[0]:
+        return t, nx, ny
+    return best
+
+
+def reflect(vx, vy, nx, ny):
+    dot = vx * nx + vy * ny
+    return vx - 2 * dot * nx, vy - 2 * dot * ny
+# !!! END PHASE: SWEPT COLLISION !!!
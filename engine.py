@@ -0,0 +1,259 @@
+import random
+from collections import namedtuple
+
+from game_objects import Paddle, Ball, BRICKS, POWER_UPS, LASERS
+from snapshot import take_snapshot, restore_snapshot
+from spatial import BrickGrid
+
+# !!! PHASE: HEADLESS ENGINE !!!
+# Everything that decides the outcome of a game lives here: no display,
+# no clock, no keyboard. main.py draws whatever this state looks like.
+
+SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
+BRICK_COLORS = [(135, 206, 250), (186, 85, 211), (255, 255, 255), (240, 248, 255)]
+POWER_UP_TYPES = ['shield', 'plasma', 'gravity', 'stasis', 'asteroid_hit', 'hyperdrive', 'extra_life',
+                  'multi_ball']
+POWER_UP_DROP_CHANCE = 0.4
+START_LIVES = 3
+# Speeds and durations in game_objects are per 1/60 s. The simulation runs
+# at a fixed STEP_RATE steps per second whatever the display does, and each
+# step advances everything by BASE_STEP_RATE / step_rate of those units.
+BASE_STEP_RATE = 60
+STEP_RATE = 60
+# Multi-ball splits every ball in play into three, up to this many
+MAX_BALLS = 256
+MULTI_BALL_ANGLE = 20
+
+# One step of player input. `fire` is a key press (one volley per True),
+# the others are held keys.
+Inputs = namedtuple('Inputs', ['left', 'right', 'space', 'fire'], defaults=(False, False, False, False))
+NO_INPUT = Inputs()
+
+
+def create_brick_wall(level=1):
+    rows = 4 + level
+    cols = 10
+    brick_width, brick_height = 75, 20
+    padding = 5
+    top = 50
+    # One grid cell per brick slot, so every brick sits in exactly one cell
+    bricks = BrickGrid(brick_width + padding, brick_height + padding, origin=(padding, top))
+    for row in range(rows):
+        for col in range(cols):
+            x = col * (brick_width + padding) + padding
+            y = row * (brick_height + padding) + top
+            color = BRICK_COLORS[row % len(BRICK_COLORS)]
+            bricks.add(BRICKS.acquire(x, y, brick_width, brick_height, color))
+    return bricks
+
+
+class GameState:
+    def __init__(self, screen_width=SCREEN_WIDTH, screen_height=SCREEN_HEIGHT, seed=None,
+                 drop_chance=POWER_UP_DROP_CHANCE, level_pack=None, step_rate=STEP_RATE):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.step_rate = step_rate
+        self.dt = BASE_STEP_RATE / step_rate
+        self.drop_chance = drop_chance
+        # Optional LevelPack; past its last level it starts over
+        self.level_pack = level_pack
+        # All game randomness comes from here, never from the global random module
+        self.rng = random.Random()
+        self.paddle = Paddle(screen_width, screen_height)
+        # Every ball in play; a life is lost when the last one is
+        self.balls = [Ball(screen_width, screen_height, self.rng)]
+        self.power_ups = []
+        self.lasers = []
+        # Bricks go back to their pool at the start of the next step, once
+        # the caller is done with the step's events
+        self.dead_bricks = []
+        self.bricks = None
+        # Counts every brick hit, so snapshots can tell whether the wall
+        # changed since the last one; self.wall is the snapshot.Wall of the
+        # current level
+        self.bricks_changed = 0
+        self.wall = None
+        # Optional FrameProfiler; step() reports its phases to it
+        self.profiler = None
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # Every game gets a seed, so any game can be replayed from its inputs
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng.seed(self.seed)
+        self.paddle.reset()
+        self._reset_balls()
+        self.level = 1
+        self._replace_bricks()
+        self.score = 0
+        self.lives = START_LIVES
+        self.frame = 0
+        self.status = 'playing'
+        POWER_UPS.release_all(self.power_ups)
+        LASERS.release_all(self.lasers)
+        self.power_ups.clear()
+        self.lasers.clear()
+
+    def step(self, inputs=NO_INPUT):
+        # Advances the game by one fixed step (1 / step_rate seconds) and
+        # returns what happened, as a list of (event, data) tuples, so the
+        # caller can play sounds and effects.
+        events = []
+        if self.status != 'playing':
+            return events
+        self.frame += 1
+        paddle, balls, dt = self.paddle, self.balls, self.dt
+        if self.dead_bricks:
+            BRICKS.release_all(self.dead_bricks)
+            self.dead_bricks.clear()
+
+        if inputs.space:
+            for ball in balls:
+                ball.is_glued = False
+        if inputs.fire and paddle.has_laser:
+            self.lasers.append(LASERS.acquire(paddle.rect.centerx - 30, paddle.rect.top))
+            self.lasers.append(LASERS.acquire(paddle.rect.centerx + 30, paddle.rect.top))
+            events.append(('laser', paddle.rect.center))
+
+        paddle.update(inputs.left, inputs.right, dt)
+        lost = []
+        for ball in balls:
+            ball_status, collision = ball.update(paddle, inputs.space, self.bricks, dt)
+            if ball_status == 'lost':
+                lost.append(ball)
+            elif collision in ['wall', 'paddle']:
+                events.append(('bounce', ball.rect.center))
+        profiler = self.profiler
+        if profiler:
+            profiler.lap('paddle_ball')
+
+        if lost:
+            for ball in lost:
+                balls.remove(ball)
+            if not balls:
+                balls.append(lost[0])
+                self.lives -= 1
+                if self.lives <= 0:
+                    self.status = 'game_over'
+                    events.append(('game_over', None))
+                else:
+                    lost[0].reset()
+                    paddle.reset()
+                    events.append(('life_lost', None))
+
+        bricks = self.bricks
+        for ball in balls:
+            for brick in ball.bricks_hit:
+                # Another ball may have broken it earlier in this step
+                if brick in bricks and self._hit_brick(brick, events) and self.rng.random() < self.drop_chance:
+                    p_type = self.rng.choice(POWER_UP_TYPES)
+                    self.power_ups.append(POWER_UPS.acquire(brick.rect.centerx, brick.rect.centery, p_type))
+        if profiler:
+            profiler.lap('bricks')
+
+        for power_up in self.power_ups[:]:
+            power_up.update(dt)
+            if power_up.rect.top > self.screen_height:
+                self.power_ups.remove(power_up)
+                POWER_UPS.release(power_up)
+            elif paddle.rect.colliderect(power_up.rect):
+                if power_up.type in ['shield', 'plasma', 'gravity', 'asteroid_hit']:
+                    paddle.activate_power_up(power_up.type)
+                elif power_up.type in ['stasis', 'hyperdrive']:
+                    for ball in balls:
+                        ball.activate_power_up(power_up.type)
+                elif power_up.type == 'extra_life':
+                    self.lives += 1
+                elif power_up.type == 'multi_ball':
+                    self.split_balls()
+                self.power_ups.remove(power_up)
+                POWER_UPS.release(power_up)
+                events.append(('power_up', power_up.type))
+        if profiler:
+            profiler.lap('power_ups')
+
+        for laser in self.lasers[:]:
+            laser.update(dt)
+            if laser.rect.bottom < 0:
+                self.lasers.remove(laser)
+                LASERS.release(laser)
+            else:
+                brick = self.bricks.first_hit(laser.rect)
+                if brick:
+                    self._hit_brick(brick, events)
+                    self.lasers.remove(laser)
+                    LASERS.release(laser)
+        if profiler:
+            profiler.lap('lasers')
+
+        if not self.bricks.breakable:
+            self.level += 1
+            self._replace_bricks()
+            self._reset_balls()
+            paddle.reset()
+            events.append(('level_up', self.level))
+
+        return events
+
+    @property
+    def ball(self):
+        # The first ball in play (the only one outside multi-ball)
+        return self.balls[0]
+
+    def split_balls(self):
+        # Each ball carries on and is joined by two copies a few degrees
+        # either side of its course, with its glue, stasis and speed
+        for ball in self.balls[:]:
+            for angle in (-MULTI_BALL_ANGLE, MULTI_BALL_ANGLE):
+                if len(self.balls) >= MAX_BALLS:
+                    return
+                self.balls.append(ball.split(angle))
+
+    def add_balls(self, count):
+        # Stress mode: launches extra balls off the paddle in random directions
+        paddle = self.paddle
+        for _ in range(count):
+            ball = Ball(self.screen_width, self.screen_height, self.rng)
+            ball.launch(paddle.rect.centerx, paddle.rect.top - ball.radius, self.rng.uniform(-60, 60))
+            self.balls.append(ball)
+
+    def start_level(self, level):
+        # Jumps straight to a level; the old wall goes back to the pool
+        self.level = level
+        self._replace_bricks()
+
+    def snapshot(self):
+        # A copy of the game to come back to with restore(), for search bots
+        # and rollback
+        return take_snapshot(self)
+
+    def restore(self, snapshot):
+        restore_snapshot(self, snapshot)
+
+    def _reset_balls(self):
+        del self.balls[1:]
+        self.balls[0].reset()
+
+    def _replace_bricks(self):
+        if self.bricks is not None:
+            self.dead_bricks.extend(self.bricks)
+        if self.level_pack is not None:
+            self.bricks = self.level_pack.build((self.level - 1) % len(self.level_pack))
+        else:
+            self.bricks = create_brick_wall(self.level)
+
+    def _hit_brick(self, brick, events):
+        # True if the brick broke
+        if not brick.breakable:
+            return False
+        self.bricks_changed += 1
+        brick.hit_points -= 1
+        if brick.hit_points > 0:
+            events.append(('brick_hit', brick))
+            return False
+        self.score += 10
+        self.bricks.remove(brick)
+        self.dead_bricks.append(brick)
+        events.append(('brick_break', brick))
+        return True
+# !!! END PHASE: HEADLESS ENGINE !!!
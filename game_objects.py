@@ -1,10 +1,16 @@
 import pygame
 import random
 import math
+import functools
 
-# Initialize the font module for the power-up letters
-pygame.font.init()
-POWERUP_FONT = pygame.font.Font(None, 20)
+from atlas import ATLAS, RECT, POWER_UP
+from particles import ParticleSystem
+from trails import Trail, circle_sprite
+from collision import sweep_circle_rect, sweep_circle_walls, reflect
+from pool import ObjectPool
+
+# Bounces the ball may resolve inside a single update
+MAX_HITS_PER_STEP = 8
 
 class Paddle:
     # ... (This class is unchanged from the previous version)
@@ -31,9 +37,13 @@ class Paddle:
             self.width,
             self.height
         )
+        # Exact position, and where the last update started from, for
+        # drawing between two simulation steps
+        self.x = self.prev_x = self.rect.x
 
     def reset(self):
         self.rect.x = self.screen_width // 2 - self.original_width // 2
+        self.x = self.prev_x = self.rect.x
         self.width = self.original_width
         self.rect.width = self.width
         self.has_laser = False
@@ -41,22 +51,36 @@ class Paddle:
         for power_up in self.power_up_timers:
             self.power_up_timers[power_up] = 0
 
-    def update(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
-            self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT]:
-            self.rect.x += self.speed
+    def update(self, left=False, right=False, dt=1.0):
+        # Input comes from the caller so the paddle works without a display.
+        # dt is in 1/60 s frames, like every speed and duration here.
+        self.prev_x = self.x
+        if left:
+            self.x -= self.speed * dt
+        if right:
+            self.x += self.speed * dt
+        self.rect.x = round(self.x)
 
         if self.rect.left < 0:
             self.rect.left = 0
+            self.x = self.rect.x
         if self.rect.right > self.screen_width:
             self.rect.right = self.screen_width
+            self.x = self.rect.x
             
-        self._update_power_ups()
+        self._update_power_ups(dt)
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, self.color, self.rect)
+    def sprite_key(self):
+        return (RECT, self.rect.width, self.rect.height, self.color)
+
+    def topleft(self, alpha=1.0):
+        # alpha: how far between the last two simulation steps to draw
+        if alpha < 1:
+            return between(self.prev_x, self.x, alpha), self.rect.y
+        return self.rect.topleft
+
+    def draw(self, screen, alpha=1.0):
+        return ATLAS.draw(screen, (self,), alpha)[0]
         
     def activate_power_up(self, type):
         duration = 600
@@ -66,6 +90,7 @@ class Paddle:
                 self.width = 150
                 self.rect.width = self.width
                 self.rect.centerx = current_center
+                self.x = self.prev_x = self.rect.x
             self.power_up_timers['grow'] = duration
         elif type == 'laser':
             self.has_laser = True
@@ -74,26 +99,32 @@ class Paddle:
             self.has_glue = True
             self.power_up_timers['glue'] = duration
             
-    def _update_power_ups(self):
+    def _update_power_ups(self, dt=1.0):
         if self.power_up_timers['grow'] > 0:
-            self.power_up_timers['grow'] -= 1
+            self.power_up_timers['grow'] -= dt
             if self.power_up_timers['grow'] <= 0:
                 current_center = self.rect.centerx
                 self.width = self.original_width
                 self.rect.width = self.width
                 self.rect.centerx = current_center
+                self.x = self.prev_x = self.rect.x
         if self.power_up_timers['laser'] > 0:
-            self.power_up_timers['laser'] -= 1
+            self.power_up_timers['laser'] -= dt
             if self.power_up_timers['laser'] <= 0:
                 self.has_laser = False
         if self.power_up_timers['glue'] > 0:
-            self.power_up_timers['glue'] -= 1
+            self.power_up_timers['glue'] -= dt
             if self.power_up_timers['glue'] <= 0:
                 self.has_glue = False
 
 
 class Ball:
-    def __init__(self, screen_width, screen_height):
+    # Trail length of new balls; the quality governor lowers it
+    max_trail = 15
+
+    def __init__(self, screen_width, screen_height, rng=random):
+        # rng: the game's random.Random, so a seeded game plays out the same
+        self.rng = rng
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.radius = 10
@@ -105,70 +136,146 @@ class Ball:
         self.slow_timer = 0
         self.base_speed = 6
 
-        self.trail = []
-        self.max_trail = 15
+        self.trail = Trail(self.max_trail)
 
         self.reset()
 
     def reset(self):
-        self.rect.center = (self.screen_width // 2, self.screen_height // 2)
-        self.speed_x = self.base_speed * random.choice((1, -1))
+        self.x, self.y = self.screen_width // 2, self.screen_height // 2
+        self.prev_x, self.prev_y = self.x, self.y
+        self.rect.center = (self.x, self.y)
+        self.speed_x = self.base_speed * self.rng.choice((1, -1))
         self.speed_y = -self.base_speed
         self.is_glued = False
         self.is_slowed = False
         self.slow_timer = 0
+        self.bricks_hit = []
         self.trail.clear()
 
-    def update(self, paddle, launch_ball=False):
-        collision_object = None
+    def update(self, paddle, launch_ball=False, bricks=None, dt=1.0):
+        # Moves the ball by dt frames. Bricks it hits on the way are left in
+        # self.bricks_hit for the caller to break.
+        self.bricks_hit = []
+        self.prev_x, self.prev_y = self.x, self.y
 
         if self.is_glued:
-            self.rect.centerx = paddle.rect.centerx
-            self.rect.bottom = paddle.rect.top
+            self.x = paddle.rect.centerx
+            self.y = paddle.rect.top - self.radius
+            self.rect.center = (self.x, self.y)
             if launch_ball:
                 self.is_glued = False
-                self.speed_x = self.base_speed * random.choice((1, -1))
+                self.speed_x = self.base_speed * self.rng.choice((1, -1))
                 self.speed_y = -self.base_speed
             return 'playing', None
 
         if self.is_slowed:
-            self.slow_timer -= 1
+            self.slow_timer -= dt
             if self.slow_timer <= 0:
                 self.speed_x *= 2
                 self.speed_y *= 2
                 self.is_slowed = False
 
-        self.rect.x += self.speed_x
-        self.rect.y += self.speed_y
+        collision_object = self._move(paddle, bricks, dt)
+        self.rect.center = (round(self.x), round(self.y))
 
         self.trail.append(self.rect.center)
-        if len(self.trail) > self.max_trail:
-            self.trail.pop(0)
-
-        if self.rect.top <= 0:
-            self.speed_y *= -1
-            collision_object = 'wall'
-        if self.rect.left <= 0 or self.rect.right >= self.screen_width:
-            self.speed_x *= -1
-            collision_object = 'wall'
-
-        if self.rect.colliderect(paddle.rect) and self.speed_y > 0:
-            if paddle.has_glue:
-                self.is_glued = True
-            self.speed_y *= -1
-            collision_object = 'paddle'
 
         if self.rect.top > self.screen_height:
             return 'lost', None
 
         return 'playing', collision_object
 
-    def draw(self, screen):
-        for i, (x, y) in enumerate(self.trail):
-            alpha = max(30, 255 - i * 15)
-            radius = max(2, self.radius - i // 2)
-            pygame.draw.circle(screen, (180, 200, 255), (x, y), radius)
-        pygame.draw.circle(screen, self.color, self.rect.center, self.radius)
+    def _move(self, paddle, bricks, dt):
+        # Swept movement: advance to the earliest contact, reflect off the face
+        # that was hit and carry on with the rest of the step.
+        collision_object = None
+        remaining = dt
+        for _ in range(MAX_HITS_PER_STEP):
+            dx, dy = self.speed_x * remaining, self.speed_y * remaining
+            hit = self._first_contact(paddle, bricks, dx, dy)
+            if hit is None:
+                self.x += dx
+                self.y += dy
+                break
+
+            t, nx, ny, obj = hit
+            self.x += dx * t
+            self.y += dy * t
+            self.speed_x, self.speed_y = reflect(self.speed_x, self.speed_y, nx, ny)
+            remaining *= 1 - t
+            if obj is paddle:
+                collision_object = 'paddle'
+                if paddle.has_glue:
+                    self.is_glued = True
+                    break
+            elif obj is None:
+                collision_object = collision_object or 'wall'
+            else:
+                self.bricks_hit.append(obj)
+        return collision_object
+
+    def _first_contact(self, paddle, bricks, dx, dy):
+        x, y, radius = self.x, self.y, self.radius
+        best = None
+        wall = sweep_circle_walls(x, y, radius, dx, dy, self.screen_width)
+        if wall and self._approaching(wall):
+            best = wall + (None,)
+
+        # Broadphase: the box the ball sweeps through this step. Only what
+        # it overlaps gets the exact swept test, so with hundreds of balls
+        # the cost follows the contacts rather than balls x objects.
+        # (Rect.move() would truncate a fractional move and could come up a
+        # pixel short.)
+        left, top = math.floor(min(x, x + dx) - radius) - 1, math.floor(min(y, y + dy) - radius) - 1
+        right, bottom = math.ceil(max(x, x + dx) + radius) + 1, math.ceil(max(y, y + dy) + radius) + 1
+        swept = pygame.Rect(left, top, right - left, bottom - top)
+
+        # Like before, the paddle only catches a ball that is coming down
+        if self.speed_y > 0 and swept.colliderect(paddle.rect):
+            hit = sweep_circle_rect(x, y, radius, dx, dy, paddle.rect)
+            if hit and self._approaching(hit) and (best is None or hit[0] < best[0]):
+                best = hit + (paddle,)
+
+        if bricks and swept.colliderect(bricks.bounds):
+            for brick in bricks.query(swept):
+                if brick in self.bricks_hit:
+                    continue
+                hit = sweep_circle_rect(x, y, radius, dx, dy, brick.rect)
+                if hit and self._approaching(hit) and (best is None or hit[0] < best[0]):
+                    best = hit + (brick,)
+        return best
+
+    def _approaching(self, hit):
+        # Ignore faces the ball is already moving away from
+        return self.speed_x * hit[1] + self.speed_y * hit[2] < 0
+
+    def draw(self, screen, alpha=1.0):
+        center = self.rect.center
+        if alpha < 1:
+            center = (between(self.prev_x, self.x, alpha), between(self.prev_y, self.y, alpha))
+        trail_rects = self.trail.draw(screen, ball_trail_sprites(self.radius, self.trail.capacity))
+        return pygame.draw.circle(screen, self.color, center, self.radius).unionall(trail_rects)
+
+    def split(self, angle):
+        # A copy of this ball, turned angle degrees off its course
+        ball = Ball(self.screen_width, self.screen_height, self.rng)
+        ball.x, ball.y = self.x, self.y
+        ball.prev_x, ball.prev_y = self.prev_x, self.prev_y
+        ball.rect.center = self.rect.center
+        ball.speed_x, ball.speed_y = _rotate(self.speed_x, self.speed_y, angle)
+        ball.is_glued = self.is_glued
+        ball.is_slowed = self.is_slowed
+        ball.slow_timer = self.slow_timer
+        return ball
+
+    def launch(self, x, y, angle):
+        # Sends the ball off from (x, y), angle degrees from straight up
+        self.x, self.y = x, y
+        self.prev_x, self.prev_y = x, y
+        self.rect.center = (round(x), round(y))
+        self.speed_x, self.speed_y = _rotate(0, -self.base_speed, angle)
+        self.is_glued = False
+        self.trail.clear()
 
     def activate_power_up(self, type):
         if type == 'stasis' and not self.is_slowed:
@@ -180,14 +287,47 @@ class Ball:
             self.speed_x *= 1.5
             self.speed_y *= 1.5
 
+
+def between(previous, current, alpha):
+    # Pixel position alpha of the way from one simulation step to the next
+    return round(previous + (current - previous) * alpha)
+
+
+def _rotate(vx, vy, degrees):
+    angle = math.radians(degrees)
+    cos, sin = math.cos(angle), math.sin(angle)
+    return vx * cos - vy * sin, vx * sin + vy * cos
+
+
+@functools.lru_cache(maxsize=None)
+def ball_trail_sprites(radius, length):
+    # Oldest point first: largest and most opaque
+    return tuple(circle_sprite((180, 200, 255), max(2, radius - i // 2), max(30, 255 - i * 15))
+                 for i in range(length))
+
+
 class Brick:
-    # ... (This class is unchanged from the previous version)
-    def __init__(self, x, y, width, height, color):
+    # Steel bricks deflect the ball and lasers but never break
+    __slots__ = ('rect', 'color', 'hit_points', 'breakable')
+
+    def __init__(self, x, y, width, height, color, hit_points=1, breakable=True):
         self.rect = pygame.Rect(x, y, width, height)
+        self.spawn(x, y, width, height, color, hit_points, breakable)
+
+    def spawn(self, x, y, width, height, color, hit_points=1, breakable=True):
+        self.rect.update(x, y, width, height)
         self.color = color
+        self.hit_points = hit_points
+        self.breakable = breakable
+
+    def sprite_key(self):
+        return (RECT, self.rect.width, self.rect.height, self.color)
+
+    def topleft(self, alpha=1.0):
+        return self.rect.topleft
 
     def draw(self, screen):
-        pygame.draw.rect(screen, self.color, self.rect)
+        return ATLAS.draw(screen, (self,))[0]
 
 
 class PowerUp:
@@ -198,146 +338,118 @@ class PowerUp:
         'stasis':       {'color': (0, 255, 255),   'char': 'T', 'message': 'Stasis Field Active!'},
         'asteroid_hit': {'color': (255, 100, 100), 'char': 'A', 'message': 'Hull Damage!'},
         'hyperdrive':   {'color': (255, 255, 0),   'char': 'H', 'message': 'Hyperdrive!'},
-        'extra_life':   {'color': (255, 255, 255), 'char': '+', 'message': 'Extra Pod Online!'}
+        'extra_life':   {'color': (255, 255, 255), 'char': '+', 'message': 'Extra Pod Online!'},
+        'multi_ball':   {'color': (255, 165, 0),   'char': 'M', 'message': 'Multi-Ball!'}
     }
 
+    __slots__ = ('rect', 'type', 'y', 'prev_y')
+    width = 30
+    height = 15
+    speed_y = 3
+
     def __init__(self, x, y, type):
-        self.width = 30
-        self.height = 15
         self.rect = pygame.Rect(x, y, self.width, self.height)
-        self.speed_y = 3
+        self.spawn(x, y, type)
+
+    def spawn(self, x, y, type):
+        self.rect.topleft = (x, y)
+        self.y = self.prev_y = y
         self.type = type
-        self.color = self.PROPERTIES[type]['color']
-        self.char = self.PROPERTIES[type]['char']
 
-    def update(self):
-        self.rect.y += self.speed_y
+    @property
+    def color(self):
+        return self.PROPERTIES[self.type]['color']
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, self.color, self.rect, border_radius=4)
-        char_surface = POWERUP_FONT.render(self.char, True, (0, 0, 0))
-        char_rect = char_surface.get_rect(center=self.rect.center)
-        screen.blit(char_surface, char_rect)
+    @property
+    def char(self):
+        return self.PROPERTIES[self.type]['char']
+
+    def update(self, dt=1.0):
+        self.prev_y = self.y
+        self.y += self.speed_y * dt
+        self.rect.y = round(self.y)
+
+    def sprite_key(self):
+        properties = self.PROPERTIES[self.type]
+        return (POWER_UP, self.width, self.height, properties['color'], properties['char'])
+
+    def topleft(self, alpha=1.0):
+        if alpha < 1:
+            return self.rect.x, between(self.prev_y, self.y, alpha)
+        return self.rect.topleft
+
+    def draw(self, screen, alpha=1.0):
+        return ATLAS.draw(screen, (self,), alpha)[0]
 
 class Laser:
-    # ... (This class is unchanged from the previous version)
+    __slots__ = ('rect', 'y', 'prev_y')
+    width = 5
+    height = 15
+    color = (255, 255, 0)
+    speed_y = -8
+
     def __init__(self, x, y):
-        self.width = 5
-        self.height = 15
         self.rect = pygame.Rect(x, y, self.width, self.height)
-        self.color = (255, 255, 0)
-        self.speed_y = -8
+        self.spawn(x, y)
 
-    def update(self):
-        self.rect.y += self.speed_y
+    def spawn(self, x, y):
+        self.rect.topleft = (x, y)
+        self.y = self.prev_y = y
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, self.color, self.rect)
+    def update(self, dt=1.0):
+        self.prev_y = self.y
+        self.y += self.speed_y * dt
+        self.rect.y = round(self.y)
 
-# !!! PHASE: VISUAL EFFECTS !!!
-class Particle:
-    def __init__(self, x, y, color, min_size, max_size, min_speed, max_speed, gravity):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.size = random.randint(min_size, max_size)
-        self.gravity = gravity
-        angle = random.uniform(0, 360)
-        speed = random.uniform(min_speed, max_speed)
-        self.vx = speed * math.cos(math.radians(angle))
-        self.vy = speed * math.sin(math.radians(angle))
+    def sprite_key(self):
+        return (RECT, self.width, self.height, self.color)
 
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += self.gravity
-        self.size -= 0.1 # Particles shrink over time
+    def topleft(self, alpha=1.0):
+        if alpha < 1:
+            return self.rect.x, between(self.prev_y, self.y, alpha)
+        return self.rect.topleft
 
-    def draw(self, screen):
-        if self.size > 0:
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), int(self.size))
+    def draw(self, screen, alpha=1.0):
+        return ATLAS.draw(screen, (self,), alpha)[0]
 
+# !!! PHASE: VISUAL EFFECTS !!!
 class Firework:
-    def __init__(self, screen_width, screen_height):
+    def __init__(self, screen_width, screen_height, rng=random):
+        self.rng = rng
         self.screen_width = screen_width
         self.screen_height = screen_height
-        self.x = random.randint(0, screen_width)
+        self.x = rng.randint(0, screen_width)
         self.y = screen_height
-        self.vy = -random.uniform(8, 12) # Speed of the rocket
+        self.vy = -rng.uniform(8, 12) # Speed of the rocket
         self.color = (255, 255, 255) # White rocket
         self.exploded = False
-        self.particles = []
-        self.explosion_y = random.uniform(screen_height * 0.2, screen_height * 0.5)
+        self.particles = ParticleSystem(capacity=64, seed=rng.getrandbits(32))
+        self.explosion_y = rng.uniform(screen_height * 0.2, screen_height * 0.5)
 
     def update(self):
         if not self.exploded:
             self.y += self.vy
             if self.y <= self.explosion_y:
                 self.exploded = True
-                explosion_color = (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
-                for _ in range(50): # Create 50 particles on explosion
-                    self.particles.append(Particle(self.x, self.y, explosion_color, 2, 4, 1, 4, 0.1))
+                explosion_color = (self.rng.randint(50, 255), self.rng.randint(50, 255), self.rng.randint(50, 255))
+                # Create 50 particles on explosion
+                self.particles.emit(50, self.x, self.y, explosion_color, 2, 4, 1, 4, 0.1)
         else:
-            for particle in self.particles[:]:
-                particle.update()
-                if particle.size <= 0:
-                    self.particles.remove(particle)
+            self.particles.update()
 
     def draw(self, screen):
         if not self.exploded:
             pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), 3)
         else:
-            for particle in self.particles:
-                particle.draw(screen)
+            self.particles.draw(screen)
 
     def is_dead(self):
-        return self.exploded and not self.particles
-
-
-class Star:
-    def __init__(self, screen_width, screen_height):
-        self.x = random.randint(0, screen_width)
-        self.y = random.randint(0, screen_height)
-        self.radius = random.randint(1, 2)
-        self.alpha = random.randint(100, 255)
-        self.twinkle_speed = random.uniform(1, 3)
+        return self.exploded and not len(self.particles)
 
-    def update(self):
-        self.alpha += self.twinkle_speed
-        if self.alpha > 255 or self.alpha < 100:
-            self.twinkle_speed *= -1
-        self.alpha = max(100, min(255, self.alpha))
-
-    def draw(self, screen):
-        color = (255, 255, 255)
-        pygame.draw.circle(screen, color, (self.x, self.y), self.radius)
-
-class Meteor:
-    def __init__(self, screen_width, screen_height):
-        self.x = random.randint(0, screen_width)
-        self.y = random.randint(0, screen_height)
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(2, 5)
-        self.vx = math.cos(angle) * speed
-        self.vy = math.sin(angle) * speed
-        self.radius = random.randint(2, 4)
-        self.trail = []
+# !!! END PHASE: VISUAL EFFECTS !!!
 
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.trail.append((int(self.x), int(self.y)))
-        if len(self.trail) > 15:
-            self.trail.pop(0)
 
-    def draw(self, screen):
-        for i, (tx, ty) in enumerate(self.trail):
-            fade = max(50, 255 - i * 15)
-            color = (fade, fade, 255)
-            pygame.draw.circle(screen, color, (tx, ty), max(1, self.radius - i // 3))
-        pygame.draw.circle(screen, (255, 255, 255), (int(self.x), int(self.y)), self.radius)
-
-    def off_screen(self, screen_width, screen_height):
-        return (self.x < -20 or self.x > screen_width + 20 or
-                self.y < -20 or self.y > screen_height + 20)
-# !!! END PHASE: VISUAL EFFECTS !!!
+# Free lists for everything that is spawned and discarded during play
+BRICKS = ObjectPool(Brick)
+POWER_UPS = ObjectPool(PowerUp)
+LASERS = ObjectPool(Laser)
@@ -0,0 +1,271 @@
+import argparse
+import hashlib
+import mmap
+import struct
+import time
+from collections import namedtuple
+
+from game_objects import BRICKS
+from spatial import BrickGrid
+
+# !!! PHASE: LEVEL PACKS !!!
+# A level pack holds any number of levels in one binary file. The file is
+# memory-mapped and only the index entry and the bytes of the level being
+# started are touched, so opening a pack of thousands of levels costs the
+# same as opening a pack of one, and the rest of it is never read.
+#
+# File layout (little endian):
+#   header  magic 'ARKL', version u8, level count u32, palette size u8,
+#           then one RGB triplet (3 x u8) per palette color
+#   index   per level: offset of its record u32, brick count u16
+#   record  name length u8, name (utf-8), brick width u8, brick height u8,
+#           padding u8, top u16, columns u8, rows u8, then two bytes per
+#           slot, row by row: type in the top 2 bits and hit points in the
+#           low 6 bits (0 for an empty slot), then the color index
+#
+# Text format (compiled with `python levelpack.py levels.txt levels.arkl`):
+#   # comment
+#   palette 135,206,250 186,85,211     RGB colors, referenced by index
+#   layout 75 20 5 50                  brick width, height, padding, top
+#   level First steps                  starts a level, its rows follow
+#   10 10 .. 21 21 S4
+# Each cell is two characters: hit points 1-9 (or S for steel) and a
+# palette index 0-9, so a palette holds up to 10 colors; '..' leaves the
+# slot empty. palette and layout apply to every level after them. A pack
+# needs at least one level, and every level at least one brick that is not
+# steel, or it would be cleared as soon as it starts.
+
+MAGIC = b'ARKL'
+VERSION = 1
+HEADER = struct.Struct('<4sBIB')
+INDEX = struct.Struct('<IH')
+LAYOUT = struct.Struct('<BBBHBB')
+CELL = struct.Struct('<BB')
+
+EMPTY, NORMAL, STEEL = 0, 1, 2
+MAX_HIT_POINTS = 63
+MAX_NAME_BYTES = 255
+# Largest brick width, height, padding and top, columns and rows a record holds
+LAYOUT_LIMITS = (255, 255, 255, 65535)
+MAX_COLUMNS = MAX_ROWS = 255
+# Cells name their color with one digit
+MAX_COLORS = 10
+DEFAULT_PALETTE = [(135, 206, 250), (186, 85, 211), (255, 255, 255), (240, 248, 255), (160, 160, 170)]
+# Brick width, brick height, padding and top of create_brick_wall
+DEFAULT_LAYOUT = (75, 20, 5, 50)
+
+# bricks is a list of (column, row, type, hit points, color index)
+Level = namedtuple('Level', ['name', 'layout', 'bricks'])
+
+
+def pack_bytes(levels, palette=DEFAULT_PALETTE):
+    out = bytearray(HEADER.pack(MAGIC, VERSION, len(levels), len(palette)))
+    for color in palette:
+        out.extend(bytes(color))
+    index_at = len(out)
+    out.extend(bytes(INDEX.size * len(levels)))
+    for number, level in enumerate(levels):
+        INDEX.pack_into(out, index_at + number * INDEX.size, len(out), len(level.bricks))
+        # Cut on a character boundary, so the name still decodes
+        name = level.name.encode('utf-8')[:MAX_NAME_BYTES].decode('utf-8', 'ignore').encode('utf-8')
+        out.append(len(name))
+        out.extend(name)
+        cols = max((brick[0] for brick in level.bricks), default=-1) + 1
+        rows = max((brick[1] for brick in level.bricks), default=-1) + 1
+        cells = bytearray(CELL.size * cols * rows)
+        for col, row, kind, hit_points, color in level.bricks:
+            CELL.pack_into(cells, CELL.size * (row * cols + col), kind << 6 | hit_points, color)
+        out.extend(LAYOUT.pack(*level.layout, cols, rows))
+        out.extend(cells)
+    return bytes(out)
+
+
+def write_pack(path, levels, palette=DEFAULT_PALETTE):
+    with open(path, 'wb') as f:
+        f.write(pack_bytes(levels, palette))
+
+
+def parse_text(text):
+    # Returns (palette, levels) read from the text format above
+    palette = list(DEFAULT_PALETTE)
+    layout = DEFAULT_LAYOUT
+    levels = []
+    row = 0
+    # Line of the 'level' that starts levels[-1]
+    level_line = 0
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        word, _, rest = line.partition(' ')
+        if word == 'level':
+            _check_level(levels, level_line)
+        try:
+            if word == 'palette':
+                palette = [_parse_color(color) for color in rest.split()]
+                if not 0 < len(palette) <= MAX_COLORS:
+                    raise ValueError(f"a palette needs 1-{MAX_COLORS} colors, not {len(palette)}")
+            elif word == 'layout':
+                layout = tuple(int(value) for value in rest.split())
+                if len(layout) != 4:
+                    raise ValueError("layout needs brick width, height, padding and top")
+                for value, limit, what in zip(layout, LAYOUT_LIMITS, ('width', 'height', 'padding', 'top')):
+                    if not 0 <= value <= limit:
+                        raise ValueError(f"layout {what} {value} is not in 0-{limit}")
+                if not layout[0] or not layout[1]:
+                    raise ValueError("bricks need a width and a height")
+            elif word == 'level':
+                levels.append(Level(rest.strip() or f"Level {len(levels) + 1}", layout, []))
+                row = 0
+                level_line = number
+            elif not levels:
+                raise ValueError("brick row before the first 'level' line")
+            else:
+                cells = line.split()
+                if len(cells) > MAX_COLUMNS:
+                    raise ValueError(f"{len(cells)} columns, at most {MAX_COLUMNS} fit")
+                if row >= MAX_ROWS:
+                    raise ValueError(f"more than {MAX_ROWS} rows")
+                for col, cell in enumerate(cells):
+                    brick = _parse_cell(cell, len(palette))
+                    if brick:
+                        levels[-1].bricks.append((col, row) + brick)
+                row += 1
+        except ValueError as error:
+            raise ValueError(f"line {number}: {error}") from None
+    _check_level(levels, level_line)
+    if not levels:
+        raise ValueError("no 'level' lines")
+    return palette, levels
+
+
+def _check_level(levels, line):
+    # A level with nothing to break would be cleared on its first step
+    if levels and not any(brick[2] != STEEL for brick in levels[-1].bricks):
+        raise ValueError(f"line {line}: level {levels[-1].name!r} has no breakable bricks")
+
+
+def _parse_color(text):
+    parts = text.split(',')
+    if len(parts) != 3 or not all(part.isdigit() and int(part) <= 255 for part in parts):
+        raise ValueError(f"bad color {text!r}, colors are r,g,b in 0-255")
+    return tuple(int(part) for part in parts)
+
+
+def _parse_cell(cell, palette_size):
+    if cell == '..':
+        return None
+    if len(cell) != 2 or not cell[1].isdigit():
+        raise ValueError(f"bad cell {cell!r}")
+    color = int(cell[1])
+    if color >= palette_size:
+        raise ValueError(f"color {color} is not in the palette")
+    if cell[0] == 'S':
+        return STEEL, 0, color
+    if cell[0] in '123456789':
+        return NORMAL, int(cell[0]), color
+    raise ValueError(f"bad cell {cell!r}")
+
+
+def compile_text(source, target):
+    with open(source) as f:
+        palette, levels = parse_text(f.read())
+    write_pack(target, levels, palette)
+    return len(levels)
+
+
+class LevelPack:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, colors = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an Arkanoid level pack")
+        if version != VERSION:
+            raise ValueError(f"unsupported level pack version {version}")
+        if not self.count:
+            raise ValueError(f"{path} has no levels")
+        palette = self._map[HEADER.size:HEADER.size + 3 * colors]
+        self.palette = [tuple(palette[i:i + 3]) for i in range(0, len(palette), 3)]
+        self._index_at = HEADER.size + 3 * colors
+        self._digest = None
+
+    def __len__(self):
+        return self.count
+
+    def digest(self):
+        # 64-bit hash of the whole file, so a replay can tell which pack it
+        # was recorded with. Unlike everything else here it reads every byte.
+        if self._digest is None:
+            self._digest = int.from_bytes(hashlib.blake2b(self._map, digest_size=8).digest(), 'little')
+        return self._digest
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _record(self, number):
+        if not 0 <= number < self.count:
+            raise IndexError(f"level {number} is not in the pack ({self.count} levels)")
+        offset, bricks = INDEX.unpack_from(self._map, self._index_at + number * INDEX.size)
+        name = self._map[offset + 1:offset + 1 + self._map[offset]].decode('utf-8')
+        return name, offset + 1 + self._map[offset], bricks
+
+    def name(self, number):
+        return self._record(number)[0]
+
+    def _bricks(self, number):
+        # Layout and (column, row, type, hit points, color) of one level
+        name, offset, count = self._record(number)
+        width, height, padding, top, cols, rows = LAYOUT.unpack_from(self._map, offset)
+        start = offset + LAYOUT.size
+        cells = CELL.iter_unpack(self._map[start:start + CELL.size * cols * rows])
+        bricks = [(slot % cols, slot // cols, packed >> 6, packed & MAX_HIT_POINTS, color)
+                  for slot, (packed, color) in enumerate(cells) if packed]
+        return name, (width, height, padding, top), bricks
+
+    def level(self, number):
+        # Decodes one level (numbered from 0) into a Level
+        return Level(*self._bricks(number))
+
+    def build(self, number):
+        # Bricks of one level, straight into a collision grid with one cell
+        # per brick slot
+        _, (width, height, padding, top), cells = self._bricks(number)
+        step_x, step_y = width + padding, height + padding
+        palette = self.palette
+        bricks = BrickGrid(step_x, step_y, origin=(padding, top))
+        add, acquire = bricks.add, BRICKS.acquire
+        for col, row, kind, hit_points, color in cells:
+            add(acquire(col * step_x + padding, row * step_y + top, width, height, palette[color],
+                        hit_points, kind != STEEL))
+        return bricks
+# !!! END PHASE: LEVEL PACKS !!!
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a text level file into a level pack, or list a pack")
+    parser.add_argument('source', help="text level file, or a .arkl pack to list")
+    parser.add_argument('target', nargs='?', help="level pack to write")
+    args = parser.parse_args()
+
+    if args.target:
+        start = time.perf_counter()
+        count = compile_text(args.source, args.target)
+        print(f"{count} levels compiled into {args.target} in {time.perf_counter() - start:.3f}s")
+        return
+    with LevelPack(args.source) as pack:
+        for number in range(len(pack)):
+            level = pack.level(number)
+            steel = sum(brick[2] == STEEL for brick in level.bricks)
+            print(f"{number + 1:5d}  {level.name:30}  {len(level.bricks):4d} bricks, {steel} steel")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,244 +1,327 @@
+import time
+STARTED = time.perf_counter()
+
 import pygame
-from game_objects import Paddle, Ball, Brick, PowerUp, Laser, Particle, Firework, Star, Meteor
-import random
+from game_objects import PowerUp, Ball
+from particles import ParticleSystem
+from text_cache import render_text
+from renderer import DirtyRectRenderer
+from starfield import Starfield, MeteorShower
+from profiler import FrameProfiler, ProfilerOverlay
+from engine import GameState, Inputs, STEP_RATE, BASE_STEP_RATE, SCREEN_WIDTH, SCREEN_HEIGHT
+from atlas import ATLAS
+from assets import ASSETS
+from pool import pool_counts
+from sound import SoundScheduler
+from timestep import FixedStep
+from quality import QualityGovernor, LEVELS
+import argparse
 import sys
 
-sound_on_icon = pygame.image.load('sound_on.png')
-sound_off_icon = pygame.image.load('sound_off.png')
-sound_on_icon = pygame.transform.scale(sound_on_icon, (32, 32))
-sound_off_icon = pygame.transform.scale(sound_off_icon, (32, 32))
-
-# Setup (unchanged)
-pygame.init()
-pygame.mixer.init()
+# Setup: only the display is started here. Fonts, sounds and images are
+# loaded by ASSETS the first time they are used, and the level pack,
+# replay and streaming modules only when their options are given.
+pygame.display.init()
 clock = pygame.time.Clock()
-screen_width, screen_height = 800, 600
+screen_width, screen_height = SCREEN_WIDTH, SCREEN_HEIGHT
 screen = pygame.display.set_mode((screen_width, screen_height))
 pygame.display.set_caption("PyGame Arkanoid")
 
-stars = []
-meteors = []
+parser = argparse.ArgumentParser(description="PyGame Arkanoid")
+parser.add_argument('--dirty-rects', action='store_true', help="only redraw what moved")
+parser.add_argument('--record', metavar='PATH', help="save the inputs of each game as a replay")
+parser.add_argument('--replay', metavar='PATH', help="watch a recorded game")
+parser.add_argument('--levels', metavar='PATH', help="play the levels of a level pack")
+parser.add_argument('--balls', type=int, default=0, metavar='N', help="stress mode: start with N extra balls")
+parser.add_argument('--fps', type=int, default=60, help="frame rate cap, 0 for none")
+parser.add_argument('--step-rate', type=int, default=STEP_RATE, help="simulation steps per second")
+parser.add_argument('--serve', type=int, nargs='?', const=0, metavar='PORT',
+                    help="stream the game to spectators (python netstream.py HOST:PORT), "
+                         "on port 7667 if none is given")
+parser.add_argument('--serve-host', default='127.0.0.1', metavar='HOST',
+                    help="address to stream on; 0.0.0.0 lets other machines watch")
+parser.add_argument('--quality', choices=['auto'] + [level.name for level in LEVELS], default='auto',
+                    help="effects quality; auto lowers it while frames run over budget")
+parser.add_argument('--startup-time', action='store_true', help="print the time to the first frame and exit")
+args = parser.parse_args()
+DIRTY_RECTS = args.dirty_rects
+
 # Colors, Fonts, Mute Setup (same as before)
 BG_COLOR = pygame.Color(10, 10, 30)
-BRICK_COLORS = [(135, 206, 250), (186, 85, 211), (255, 255, 255), (240, 248, 255)]
-title_font = pygame.font.Font(None, 70)
-game_font = pygame.font.Font(None, 40)
-message_font = pygame.font.Font(None, 30)
+# Menu background: baked parallax starfield and batched meteors
+starfield = Starfield(screen_width, screen_height, BG_COLOR)
+meteors = MeteorShower(screen_width, screen_height)
+def draw_space(surface, ticks):
+    for _ in range(ticks):
+        starfield.update(); meteors.update()
+    starfield.draw(surface); meteors.draw(surface)
+TITLE_FONT, GAME_FONT, MESSAGE_FONT = 70, 40, 30
+ICON_SIZE = (32, 32)
 
-# Sound Setup with Mute
-muted = False
+# Sound Setup with Mute: sounds requested during a frame are played
+# together by the scheduler at the end of it
+sounds = SoundScheduler(
+    ASSETS, voices=8,
+    volumes={'bounce.wav': 0.6, 'brick_break.wav': 0.6, 'game_over.wav': 0.6,
+             'laser.wav': 0.6, 'space_ambient.wav': 0.5},
+    priorities={'bounce.wav': 0, 'laser.wav': 1, 'brick_break.wav': 2,
+                'game_over.wav': 3, 'space_ambient.wav': 4})
 def toggle_mute():
-    global muted
-    muted = not muted
-    if muted:
-        for s in [bounce_sound, brick_break_sound, game_over_sound, laser_sound, ambient_music]:
-            s.set_volume(0)
-    else:
-        bounce_sound.set_volume(0.6)
-        brick_break_sound.set_volume(0.6)
-        game_over_sound.set_volume(0.6)
-        laser_sound.set_volume(0.6)
-        ambient_music.set_volume(0.5)
-
-try:
-    bounce_sound = pygame.mixer.Sound('bounce.wav')
-    brick_break_sound = pygame.mixer.Sound('brick_break.wav')
-    game_over_sound = pygame.mixer.Sound('game_over.wav')
-    laser_sound = pygame.mixer.Sound('laser.wav')
-    ambient_music = pygame.mixer.Sound('space_ambient.wav')
-    ambient_music.set_volume(0.5)
-    ambient_music.play(loops=-1)
-    # toggle_mute()
-except:
-    class Dummy:
-        def play(self): pass
-        def set_volume(self, v): pass
-    bounce_sound = brick_break_sound = game_over_sound = laser_sound = Dummy()
-
-# Game Objects
-paddle = Paddle(screen_width, screen_height)
-ball = Ball(screen_width, screen_height)
-
-# Brick Wall Function with Level Support
-def create_brick_wall(level=1):
-    bricks = []
-    rows = 4 + level
-    cols = 10
-    brick_width, brick_height = 75, 20
-    padding = 5
-    for row in range(rows):
-        for col in range(cols):
-            x = col * (brick_width + padding) + padding
-            y = row * (brick_height + padding) + 50
-            color = BRICK_COLORS[row % len(BRICK_COLORS)]
-            bricks.append(Brick(x, y, brick_width, brick_height, color))
-    return bricks
+    sounds.set_muted(not sounds.muted)
+
+if args.record or args.replay:
+    from replay import InputRecorder, ReplayLog, verify, check_level_pack
+if args.levels:
+    from levelpack import LevelPack
+
+# Game State: a replay is simulated at the step rate and with the extra
+# balls it was recorded with
+level_pack = LevelPack(args.levels) if args.levels else None
+replay_log = ReplayLog.load(args.replay) if args.replay else None
+if replay_log:
+    args.balls = replay_log.balls
+    try:
+        check_level_pack(replay_log, level_pack)
+    except ValueError as error:
+        sys.exit(f"{args.replay}: {error}")
+    if args.step_rate != replay_log.step_rate:
+        print(f"replaying at the recorded {replay_log.step_rate} steps per second, not {args.step_rate}")
+step_rate = replay_log.step_rate if replay_log else args.step_rate
+state = GameState(screen_width, screen_height, level_pack=level_pack, step_rate=step_rate)
+# Simulation clock: fixed steps, drawn in between; at most 5 steps of
+# catching up per frame. Effects (particles, stars, messages) tick at the
+# rate their speeds are written for, whatever the simulation rate.
+sim_clock = FixedStep(step_rate, max_steps=5)
+effect_clock = FixedStep(BASE_STEP_RATE, max_steps=5)
+dirty_renderer = DirtyRectRenderer(screen, BG_COLOR) if DIRTY_RECTS else None
+# Spectator stream: runs on its own thread, fed a snapshot after each step.
+# The stream is not authenticated, so it is only on localhost unless
+# --serve-host says otherwise.
+server = None
+if args.serve is not None:
+    from netstream import StateServer, PORT
+    server = StateServer(args.serve_host, args.serve or PORT)
+    server.start_thread()
+    print(f"streaming on {args.serve_host}:{server.port}")
+
+# Quality governor: fewer particles, shorter trails, fewer meteors and
+# stars while frames take longer than the frame rate allows
+frame_budget_ms = 1000 / (args.fps or 60)
+quality = QualityGovernor(frame_budget_ms)
+if args.quality != 'auto':
+    quality.fix(args.quality)
+def apply_quality():
+    settings = quality.quality
+    Ball.max_trail = settings.trail
+    for ball in state.balls:
+        ball.trail.resize(settings.trail)
+    meteors.spawn_chance = settings.meteors
+    starfield.shown = settings.star_layers
+apply_quality()
+
+# Frame profiler: F3 shows the overlay, F4 exports the recorded frames to CSV
+profiler = FrameProfiler(['events', 'paddle_ball', 'bricks', 'power_ups', 'lasers', 'publish',
+                          'particles', 'sound', 'draw', 'flip', 'idle'], budget_ms=frame_budget_ms)
+profiler_overlay = ProfilerOverlay(profiler)
+state.profiler = profiler
 
 # Variables
-bricks = create_brick_wall()
-power_ups, lasers, particles, fireworks = [], [], [], []
+particles = ParticleSystem()
+fireworks = []
 game_state = 'title_screen'
-score, lives, message_timer = 0, 3, 0
+message_timer = 0
 display_message = ""
-firework_timer, level = 0, 1
+firework_timer = 0
+recorder = None
+replay_inputs = None
+
+def start_game(seed=None):
+    global game_state, recorder
+    state.reset(seed)
+    state.add_balls(args.balls)
+    particles.clear(); fireworks.clear()
+    game_state = 'playing'
+    sounds.play('space_ambient.wav', loops=-1)
+    if args.record:
+        recorder = InputRecorder(state, args.balls)
+
+def save_recording():
+    global recorder
+    if recorder:
+        recorder.finish().save(args.record)
+        recorder = None
+
+def finish_replay():
+    global replay_inputs, display_message, message_timer
+    problems = verify(replay_log, state)
+    display_message = "Replay matches" if not problems else "Replay mismatch: " + problems[0]
+    message_timer = 300
+    print(display_message)
+    replay_inputs = None
+
+def handle_events(events):
+    # Sounds, effects and messages for one simulation step's events
+    global game_state, display_message, message_timer
+    for event, data in events:
+        if event == 'game_over':
+            game_state = 'game_over'
+            sounds.play('game_over.wav')
+            sounds.stop('space_ambient.wav')
+            save_recording()
+            if replay_inputs:
+                finish_replay()
+        elif event == 'bounce':
+            sounds.play('bounce.wav')
+            particles.emit(quality.particles(5), data[0], data[1], (255,255,0), 1,3,1,3,0)
+        elif event == 'brick_hit':
+            sounds.play('bounce.wav')
+            particles.emit(quality.particles(5), data.rect.centerx, data.rect.centery, data.color, 1,3,1,3,0.05)
+        elif event == 'brick_break':
+            sounds.play('brick_break.wav')
+            particles.emit(quality.particles(10), data.rect.centerx, data.rect.centery,
+                           [(135, 206, 250), (255, 255, 255), (186, 85, 211)],
+                           1, 3, 1, 3, 0.05)
+        elif event == 'power_up':
+            display_message = PowerUp.PROPERTIES[data]['message']
+            message_timer = 120
+        elif event == 'laser':
+            sounds.play('laser.wav')
+
+if replay_log:
+    replay_inputs = replay_log.inputs()
+    start_game(replay_log.seed)
 
 # Game Loop
+fire = space_pressed = False
 while True:
-    # Events
+    profiler.begin_frame()
+    # Simulation steps and effect ticks owed for the time the last frame took
+    steps = sim_clock.advance(clock.get_time() / 1000)
+    ticks = effect_clock.advance(clock.get_time() / 1000)
+    # Events: key presses wait for the next simulation step
+    if game_state != 'playing':
+        fire = space_pressed = False
     for event in pygame.event.get():
-        if event.type == pygame.QUIT: pygame.quit(); sys.exit()
+        if event.type == pygame.QUIT:
+            save_recording()
+            if server: server.close()
+            pygame.quit(); sys.exit()
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_SPACE:
                 if game_state in ['title_screen', 'you_win', 'game_over']:
-                    paddle.reset()
-                    ball.reset()
-                    level = 1
-                    bricks = create_brick_wall(level)
-                    score, lives = 0, 3
-                    power_ups.clear(); lasers.clear(); particles.clear(); fireworks.clear()
-                    game_state = 'playing'
-                    ambient_music.play(loops=-1)
-                elif ball.is_glued:
-                    ball.is_glued = False
+                    start_game()
+                else:
+                    space_pressed = True
             elif event.key == pygame.K_m:
                 toggle_mute()
-            elif event.key == pygame.K_f and paddle.has_laser:
-                lasers.append(Laser(paddle.rect.centerx - 30, paddle.rect.top))
-                lasers.append(Laser(paddle.rect.centerx + 30, paddle.rect.top))
-                laser_sound.play()
+            elif event.key == pygame.K_f:
+                fire = True
+            elif event.key == pygame.K_F3:
+                profiler_overlay.toggle()
+            elif event.key == pygame.K_F4:
+                csv_path, _ = profiler.export_csv(time.strftime('profile_%Y%m%d_%H%M%S.csv'))
+                display_message = f"Saved {csv_path}"
+                message_timer = 120
+    profiler.lap('events')
 
     # Update
-    screen.fill(BG_COLOR)
+    dirty = dirty_renderer is not None and game_state == 'playing'
+    drawn = []
+    if dirty:
+        dirty_renderer.begin()
+    else:
+        screen.fill(BG_COLOR)
+        if dirty_renderer:
+            dirty_renderer.invalidate()
+    profiler.lap('draw')
 
     if game_state == 'title_screen':
-        if len(stars) < 100:
-            stars.append(Star(screen_width, screen_height))
-        for star in stars:
-            star.update()
-            star.draw(screen)
-        if random.random() < 0.08:
-            meteors.append(Meteor(screen_width, screen_height))
-        for meteor in meteors[:]:
-            meteor.update()
-            meteor.draw(screen)
-            if meteor.off_screen(screen_width, screen_height):
-                meteors.remove(meteor)
-        screen.blit(title_font.render("ARKANOID", True, (255,255,255)), (screen_width//2 - 130, screen_height//2 - 80))
-        screen.blit(game_font.render("Press SPACE to Start", True, (255,255,255)), (screen_width//2 - 140, screen_height//2 + 10))
+        draw_space(screen, ticks)
+        screen.blit(render_text(ASSETS.font(TITLE_FONT), "ARKANOID", (255,255,255)), (screen_width//2 - 130, screen_height//2 - 80))
+        screen.blit(render_text(ASSETS.font(GAME_FONT), "Press SPACE to Start", (255,255,255)), (screen_width//2 - 140, screen_height//2 + 10))
 
     elif game_state == 'playing':
-        paddle.update()
-        keys = pygame.key.get_pressed()
-        ball_status, collision = ball.update(paddle, keys[pygame.K_SPACE])
-
-        if ball_status == 'lost':
-            lives -= 1
-            if lives <= 0:
-                game_state = 'game_over'
-                game_over_sound.play()
-                ambient_music.stop()
+        for _ in range(steps):
+            if replay_inputs:
+                inputs = next(replay_inputs, None)
             else:
-                ball.reset()
-                paddle.reset()
-
-        elif collision in ['wall', 'paddle']:
-            bounce_sound.play()
-            for _ in range(5):
-                particles.append(Particle(ball.rect.centerx, ball.rect.centery, (255,255,0), 1,3,1,3,0))
-
-        for brick in bricks[:]:
-            if ball.rect.colliderect(brick.rect):
-                ball.speed_y *= -1
-                score += 10
-                bricks.remove(brick)
-                brick_break_sound.play()
-                for _ in range(10):
-                    particles.append(Particle(brick.rect.centerx, brick.rect.centery,
-                                              random.choice([(135, 206, 250), (255, 255, 255), (186, 85, 211)]),
-                                              1, 3, 1, 3, 0.05))
-                if random.random() < 0.4:
-                    p_type = random.choice(['shield', 'plasma', 'gravity', 'stasis', 'asteroid_hit', 'hyperdrive', 'extra_life'])
-                    power_ups.append(PowerUp(brick.rect.centerx, brick.rect.centery, p_type))
+                keys = pygame.key.get_pressed()
+                inputs = Inputs(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], keys[pygame.K_SPACE] or space_pressed, fire)
+                fire = space_pressed = False
+                if recorder:
+                    recorder.record(inputs)
+            if inputs is None:
+                # Replay ran out of frames before the game ended
+                finish_replay()
+                game_state = 'game_over'
+                sounds.stop('space_ambient.wav')
+                break
+            # Bricks in the events go back to their pool on the next step
+            handle_events(state.step(inputs))
+            profiler.lap('events')
+            if server:
+                server.publish(state)
+                profiler.lap('publish')
+            if state.status != 'playing':
                 break
 
-        for power_up in power_ups[:]:
-            power_up.update()
-            if power_up.rect.top > screen_height:
-                power_ups.remove(power_up)
-            elif paddle.rect.colliderect(power_up.rect):
-                msg = power_up.PROPERTIES[power_up.type]['message']
-                display_message = msg
-                message_timer = 120
-                if power_up.type in ['shield', 'plasma', 'gravity', 'asteroid_hit']:
-                    paddle.activate_power_up(power_up.type)
-                elif power_up.type in ['stasis', 'hyperdrive']:
-                    ball.activate_power_up(power_up.type)
-                elif power_up.type == 'extra_life':
-                    lives += 1
-                power_ups.remove(power_up)
-
-        for laser in lasers[:]:
-            laser.update()
-            if laser.rect.bottom < 0:
-                lasers.remove(laser)
-            else:
-                for brick in bricks[:]:
-                    if laser.rect.colliderect(brick.rect):
-                        score += 10
-                        bricks.remove(brick)
-                        brick_break_sound.play()
-                        lasers.remove(laser)
-                        break
-
-        if not bricks:
-            level += 1
-            bricks = create_brick_wall(level)
-            ball.reset()
-            paddle.reset()
-
-        paddle.draw(screen)
-        ball.draw(screen)
-        for b in bricks: b.draw(screen)
-        for p in power_ups: p.draw(screen)
-        for l in lasers: l.draw(screen)
-
-        screen.blit(game_font.render(f"Score: {score}", True, (200, 200, 255)), (10, 10))
-        screen.blit(game_font.render(f"Lives: {lives}", True, (200, 200, 255)), (700, 10))
-        screen.blit(game_font.render(f"Level: {level}", True, (200, 200, 255)), (360, 10))
+        if dirty:
+            dirty_renderer.draw_bricks(state.bricks, state.bricks_changed)
+        else:
+            ATLAS.draw(screen, state.bricks)
+        alpha = sim_clock.alpha
+        drawn.append(state.paddle.draw(screen, alpha))
+        for b in state.balls: drawn.append(b.draw(screen, alpha))
+        drawn.extend(ATLAS.draw(screen, state.power_ups, alpha))
+        drawn.extend(ATLAS.draw(screen, state.lasers, alpha))
+
+        drawn.append(screen.blit(render_text(ASSETS.font(GAME_FONT), f"Score: {state.score}", (200, 200, 255)), (10, 10)))
+        drawn.append(screen.blit(render_text(ASSETS.font(GAME_FONT), f"Lives: {state.lives}", (200, 200, 255)), (700, 10)))
+        drawn.append(screen.blit(render_text(ASSETS.font(GAME_FONT), f"Level: {state.level}", (200, 200, 255)), (360, 10)))
 
     elif game_state == 'you_win' or game_state == 'game_over':
-        if len(stars) < 100:
-            stars.append(Star(screen_width, screen_height))
-        for star in stars:
-            star.update()
-            star.draw(screen)
-        if random.random() < 0.08:
-            meteors.append(Meteor(screen_width, screen_height))
-        for meteor in meteors[:]:
-            meteor.update()
-            meteor.draw(screen)
-            if meteor.off_screen(screen_width, screen_height):
-                meteors.remove(meteor)
+        draw_space(screen, ticks)
         msg = "MISSION COMPLETE!" if game_state == 'you_win' else "     MISSION FAILED"
-        screen.blit(game_font.render(msg, True, (255, 255, 255)), (screen_width // 2 - 140, screen_height // 2 - 30))
-        screen.blit(game_font.render("Press SPACE to return", True, (255,255,255)), (screen_width//2 - 140, screen_height//2 + 10))
+        screen.blit(render_text(ASSETS.font(GAME_FONT), msg, (255, 255, 255)), (screen_width // 2 - 140, screen_height // 2 - 30))
+        screen.blit(render_text(ASSETS.font(GAME_FONT), "Press SPACE to return", (255,255,255)), (screen_width//2 - 140, screen_height//2 + 10))
 
     if message_timer > 0:
-        message_timer -= 1
-        screen.blit(message_font.render(display_message, True, (200, 200, 255)),
-                    (screen_width // 2 - 100, screen_height - 60))
+        message_timer -= ticks
+        drawn.append(screen.blit(render_text(ASSETS.font(MESSAGE_FONT), display_message, (200, 200, 255)),
+                                 (screen_width // 2 - 100, screen_height - 60)))
+    profiler.lap('draw')
     # Particles
-    for p in particles[:]:
-        p.update()
-        if p.size <= 0:
-            particles.remove(p)
-    for p in particles:
-        p.draw(screen)
-
-    icon = sound_off_icon if muted else sound_on_icon
-    screen.blit(icon, (screen_width - 40, screen_height - 40))
-
-    hint = message_font.render("Press M to toggle sound", True, (180, 180, 255))
-    screen.blit(hint, (10, screen_height - 30))
-    pygame.display.flip()
-    clock.tick(60)
+    for _ in range(ticks):
+        particles.update()
+    profiler.lap('particles')
+    drawn.append(particles.draw(screen))
+
+    icon = ASSETS.image('sound_off.png' if sounds.muted else 'sound_on.png', ICON_SIZE)
+    drawn.append(screen.blit(icon, (screen_width - 40, screen_height - 40)))
+
+    hint = render_text(ASSETS.font(MESSAGE_FONT), "Press M to toggle sound", (180, 180, 255))
+    drawn.append(screen.blit(hint, (10, screen_height - 30)))
+    if profiler_overlay.visible:
+        drawn.append(profiler_overlay.draw(screen))
+    profiler.lap('draw')
+    sounds.flush()
+    profiler.lap('sound')
+    if dirty:
+        for rect in drawn:
+            dirty_renderer.add(rect)
+        dirty_renderer.present()
+    else:
+        pygame.display.flip()
+    profiler.lap('flip')
+    if args.startup_time:
+        print(f"first frame after {(time.perf_counter() - STARTED) * 1000:.1f} ms")
+        pygame.quit(); sys.exit()
+    clock.tick(args.fps)
+    # Raw time leaves out tick()'s wait, so spare time shows as headroom
+    if quality.update(clock.get_rawtime()):
+        apply_quality()
+    profiler.lap('idle')
+    profiler.end_frame({'particles': len(particles), 'bricks': len(state.bricks), 'balls': len(state.balls),
+                        'power_ups': len(state.power_ups), 'lasers': len(state.lasers),
+                        'fireworks': len(fireworks), 'stars': len(starfield), 'meteors': len(meteors),
+                        'quality': quality.quality.name, **pool_counts()})
@@ -0,0 +1,448 @@
+import argparse
+import asyncio
+import struct
+import threading
+import time
+from collections import deque
+
+from engine import POWER_UP_TYPES
+
+# !!! PHASE: STATE STREAMING !!!
+# Streams a running game to spectators over TCP, one message per simulation
+# step. Each message only carries what changed since the last step the
+# client acknowledged: sections that are byte-for-byte the same are left
+# out and bricks are sent slot by slot, so a quiet step is a few dozen
+# bytes. The server works from GameState snapshots, so the game loop only
+# hands over a snapshot and encoding happens on the server's own thread.
+#
+# Message layout (little endian), each prefixed with its length as a u32:
+#   header     tick u32, baseline tick u32 (0xFFFFFFFF: none), sections u8
+#   then every section whose bit is set, in bit order:
+#   SCORE      score u32, lives u16, level u16, status u8
+#   PADDLE     left i16, width u16
+#   BALLS      count u16, then centre x, y (i16, i16) per ball
+#   POWER_UPS  count u16, then type u8, left i16, top i16 per power-up
+#   LASERS     count u16, then left i16, top i16 per laser
+#   WALL       slot count u16, then x i16, y i16, width u16, height u16,
+#              r, g, b u8, breakable u8 per slot (width 0: empty slot)
+#   BRICKS     count u16, then slot u16, hit points u8 (255: broken) per
+#              brick that changed
+# A client answers every message with its tick (u32) once applied; that
+# becomes the baseline of the next messages.
+
+PORT = 7667
+LENGTH = struct.Struct('<I')
+HEADER = struct.Struct('<IIB')
+ACK = struct.Struct('<I')
+NO_BASELINE = 0xFFFFFFFF
+SCORE, PADDLE, BALLS, POWER_UPS, LASERS, WALL, BRICKS = (1 << bit for bit in range(7))
+SCORE_FIELDS = struct.Struct('<IHHB')
+PADDLE_FIELDS = struct.Struct('<hH')
+COUNT = struct.Struct('<H')
+POWER_UP = struct.Struct('<Bhh')
+SLOT = struct.Struct('<hhHHBBBB')
+CHANGE = struct.Struct('<HB')
+BROKEN = 255
+STATUSES = ('playing', 'game_over')
+# Frames kept for a client that has not acknowledged them yet
+HISTORY = 64
+# Samples kept for the bandwidth and latency figures
+STATS_WINDOW = 10000
+# Seconds a spectator window waits for a state before handling its events
+WATCH_POLL = 0.05
+
+
+class Frame:
+    # One published step, with its sections encoded once for every client
+    def __init__(self, tick, snapshot, time):
+        self.tick = tick
+        self.snapshot = snapshot
+        self.time = time
+        paddle = snapshot.paddle
+        self.sections = {
+            SCORE: SCORE_FIELDS.pack(snapshot.score, snapshot.lives, snapshot.level,
+                                     STATUSES.index(snapshot.status)),
+            PADDLE: PADDLE_FIELDS.pack(paddle[0], paddle[1]),
+            BALLS: _points([coordinate for ball in snapshot.balls for coordinate in ball[4:6]]),
+            POWER_UPS: COUNT.pack(len(snapshot.power_ups)) + b''.join(
+                POWER_UP.pack(POWER_UP_TYPES.index(type), left, top)
+                for type, left, top, _, _ in snapshot.power_ups),
+            LASERS: _points([coordinate for laser in snapshot.lasers for coordinate in laser[:2]]),
+        }
+
+
+def _points(flat):
+    return struct.pack(f'<H{len(flat)}h', len(flat) // 2, *flat)
+
+
+def _wall(wall):
+    out = [COUNT.pack(len(wall.bricks))]
+    for brick in wall.bricks:
+        if brick is None:
+            out.append(SLOT.pack(0, 0, 0, 0, 0, 0, 0, 0))
+        else:
+            x, y, width, height, color, breakable = brick
+            out.append(SLOT.pack(x, y, width, height, *color[:3], breakable))
+    return b''.join(out)
+
+
+def _bricks(alive, hit_points, base_alive=0, base_hit_points=b''):
+    changed = alive ^ base_alive
+    if hit_points is not base_hit_points and hit_points != base_hit_points:
+        both = alive & base_alive
+        while both:
+            bit = both & -both
+            both ^= bit
+            slot = bit.bit_length() - 1
+            if hit_points[slot] != base_hit_points[slot]:
+                changed |= bit
+    out = []
+    while changed:
+        bit = changed & -changed
+        changed ^= bit
+        slot = bit.bit_length() - 1
+        out.append(CHANGE.pack(slot, hit_points[slot] if alive & bit else BROKEN))
+    return COUNT.pack(len(out)) + b''.join(out)
+
+
+class StateEncoder:
+    # Encodes frames for one client, against the newest one it acknowledged
+    def __init__(self, history=HISTORY):
+        self.history = history
+        self.pending = {}
+        self.baseline = None
+
+    def acknowledge(self, tick):
+        # The acknowledged frame, or None for an unknown or stale tick
+        frame = self.pending.get(tick)
+        if frame is not None:
+            self.baseline = frame
+            for old in [old for old in self.pending if old <= tick]:
+                del self.pending[old]
+        return frame
+
+    def encode(self, frame):
+        base = self.baseline
+        sections, body = 0, []
+        for section, data in frame.sections.items():
+            if base is None or base.sections[section] != data:
+                sections |= section
+                body.append(data)
+        snapshot = frame.snapshot
+        if base is None or base.snapshot.wall is not snapshot.wall:
+            sections |= WALL | BRICKS
+            body.append(_wall(snapshot.wall))
+            body.append(_bricks(snapshot.alive, snapshot.hit_points))
+        elif snapshot.alive != base.snapshot.alive or snapshot.hit_points != base.snapshot.hit_points:
+            sections |= BRICKS
+            body.append(_bricks(snapshot.alive, snapshot.hit_points, base.snapshot.alive, base.snapshot.hit_points))
+
+        if len(self.pending) >= self.history:
+            del self.pending[next(iter(self.pending))]
+        self.pending[frame.tick] = frame
+        return HEADER.pack(frame.tick, NO_BASELINE if base is None else base.tick, sections) + b''.join(body)
+
+
+class RemoteState:
+    # What a client knows of the game after a message
+    def __init__(self):
+        self.tick = 0
+        self.score = 0
+        self.lives = 0
+        self.level = 1
+        self.status = 'playing'
+        self.paddle = (0, 0)
+        self.balls = []
+        self.power_ups = []
+        self.lasers = []
+        # (x, y, width, height, color, breakable) per slot, None when empty
+        self.wall = []
+        # slot -> hit points of every brick still standing
+        self.bricks = {}
+
+    def copy(self):
+        state = RemoteState()
+        state.__dict__.update(self.__dict__)
+        state.bricks = dict(self.bricks)
+        return state
+
+
+class StateDecoder:
+    def __init__(self):
+        # Applied states the server may still use as a baseline
+        self.states = {}
+
+    def decode(self, payload):
+        tick, baseline, sections = HEADER.unpack_from(payload)
+        offset = HEADER.size
+        if baseline == NO_BASELINE:
+            state = RemoteState()
+        else:
+            state = self.states[baseline].copy()
+            # The server only moves its baselines forward
+            for old in [old for old in self.states if old < baseline]:
+                del self.states[old]
+        state.tick = tick
+
+        if sections & SCORE:
+            state.score, state.lives, state.level, status = SCORE_FIELDS.unpack_from(payload, offset)
+            state.status = STATUSES[status]
+            offset += SCORE_FIELDS.size
+        if sections & PADDLE:
+            state.paddle = PADDLE_FIELDS.unpack_from(payload, offset)
+            offset += PADDLE_FIELDS.size
+        if sections & BALLS:
+            state.balls, offset = _unpack_points(payload, offset)
+        if sections & POWER_UPS:
+            count, = COUNT.unpack_from(payload, offset)
+            offset += COUNT.size
+            state.power_ups = [(POWER_UP_TYPES[type], left, top)
+                               for type, left, top in POWER_UP.iter_unpack(payload[offset:offset + count * POWER_UP.size])]
+            offset += count * POWER_UP.size
+        if sections & LASERS:
+            state.lasers, offset = _unpack_points(payload, offset)
+        if sections & WALL:
+            count, = COUNT.unpack_from(payload, offset)
+            offset += COUNT.size
+            state.wall = [(x, y, width, height, (r, g, b), bool(breakable)) if width else None
+                          for x, y, width, height, r, g, b, breakable
+                          in SLOT.iter_unpack(payload[offset:offset + count * SLOT.size])]
+            offset += count * SLOT.size
+            state.bricks = {}
+        if sections & BRICKS:
+            count, = COUNT.unpack_from(payload, offset)
+            offset += COUNT.size
+            for slot, hit_points in CHANGE.iter_unpack(payload[offset:offset + count * CHANGE.size]):
+                if hit_points == BROKEN:
+                    state.bricks.pop(slot, None)
+                else:
+                    state.bricks[slot] = hit_points
+            offset += count * CHANGE.size
+
+        self.states[tick] = state
+        return state
+
+
+def _unpack_points(payload, offset):
+    count, = COUNT.unpack_from(payload, offset)
+    offset += COUNT.size
+    flat = struct.unpack_from(f'<{count * 2}h', payload, offset)
+    return list(zip(flat[::2], flat[1::2])), offset + count * 4
+
+
+class StateServer:
+    # Call start() on a running event loop, or start_thread() to give the
+    # server a loop of its own next to a pygame loop. publish(state) after
+    # each step sends it to every client.
+    def __init__(self, host='127.0.0.1', port=PORT):
+        self.host = host
+        self.port = port
+        self.frame = None
+        self.tick = 0
+        self.clients = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.sizes = deque(maxlen=STATS_WINDOW)
+        # Publish to acknowledgement, in seconds
+        self.latencies = deque(maxlen=STATS_WINDOW)
+        self._wakers = set()
+        self._writers = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        # Port 0 picks a free one
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def start_thread(self):
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='netstream', daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def close(self):
+        # For start_thread(); on your own loop, await aclose() instead
+        asyncio.run_coroutine_threadsafe(self.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def aclose(self):
+        # Closes the port and hangs up on every client
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        while self.clients:
+            await asyncio.sleep(0.001)
+
+    def publish(self, state):
+        snapshot = state.snapshot()
+        if self._thread:
+            self._loop.call_soon_threadsafe(self._publish, snapshot, time.perf_counter())
+        else:
+            self._publish(snapshot, time.perf_counter())
+
+    def _publish(self, snapshot, published):
+        self.tick += 1
+        self.frame = Frame(self.tick, snapshot, published)
+        for wake in self._wakers:
+            wake.set()
+
+    def stats(self):
+        sizes = sorted(self.sizes)
+        latencies = sorted(self.latencies)
+        return {'clients': self.clients, 'frames': self.frames_sent, 'bytes': self.bytes_sent,
+                'mean_bytes': sum(sizes) / len(sizes) if sizes else 0,
+                'p99_bytes': sizes[len(sizes) * 99 // 100] if sizes else 0,
+                'p50_latency_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0,
+                'p99_latency_ms': latencies[len(latencies) * 99 // 100] * 1000 if latencies else 0}
+
+    async def _serve_client(self, reader, writer):
+        encoder = StateEncoder()
+        wake = asyncio.Event()
+        if self.frame:
+            wake.set()
+        self._wakers.add(wake)
+        self._writers.add(writer)
+        self.clients += 1
+        acks = asyncio.create_task(self._read_acks(reader, encoder, wake))
+        sent = None
+        try:
+            while True:
+                await wake.wait()
+                wake.clear()
+                if acks.done():
+                    break
+                # A slow client skips straight to the newest step
+                frame = self.frame
+                if frame is sent:
+                    continue
+                payload = encoder.encode(frame)
+                writer.write(LENGTH.pack(len(payload)) + payload)
+                await writer.drain()
+                sent = frame
+                self.frames_sent += 1
+                self.bytes_sent += LENGTH.size + len(payload)
+                self.sizes.append(LENGTH.size + len(payload))
+        except ConnectionError:
+            pass
+        finally:
+            self._wakers.discard(wake)
+            self._writers.discard(writer)
+            self.clients -= 1
+            acks.cancel()
+            writer.close()
+
+    async def _read_acks(self, reader, encoder, wake):
+        try:
+            while True:
+                tick, = ACK.unpack(await reader.readexactly(ACK.size))
+                frame = encoder.acknowledge(tick)
+                if frame is not None:
+                    self.latencies.append(time.perf_counter() - frame.time)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            wake.set()
+
+
+class StateClient:
+    def __init__(self):
+        self.decoder = StateDecoder()
+        self.bytes_received = 0
+        self.reader = self.writer = None
+
+    async def connect(self, host='127.0.0.1', port=PORT):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def receive(self):
+        # The next state from the server; raises IncompleteReadError once
+        # the server goes away
+        length, = LENGTH.unpack(await self.reader.readexactly(LENGTH.size))
+        payload = await self.reader.readexactly(length)
+        self.bytes_received += LENGTH.size + length
+        state = self.decoder.decode(payload)
+        self.writer.write(ACK.pack(state.tick))
+        return state
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+# !!! END PHASE: STATE STREAMING !!!
+
+
+async def watch(host, port, scale=1):
+    # A spectator window, `scale` times the game's size: draws each state
+    # as it arrives, every layer in one blits() call from a scaled atlas
+    import pygame
+    from atlas import SpriteAtlas, RECT, POWER_UP
+    from engine import SCREEN_WIDTH, SCREEN_HEIGHT
+    from game_objects import Laser, Paddle, PowerUp
+
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((round(SCREEN_WIDTH * scale), round(SCREEN_HEIGHT * scale)))
+    pygame.display.set_caption(f"Arkanoid - watching {host}:{port}")
+    atlas = SpriteAtlas(scale)
+    font = pygame.font.Font(None, round(36 * scale))
+    # Only the paddle's left edge and width are streamed; its row is fixed
+    paddle = Paddle(SCREEN_WIDTH, SCREEN_HEIGHT)
+    client = StateClient()
+    await client.connect(host, port)
+    receive = None
+    try:
+        while True:
+            # Nothing is streamed between games, so keep the window
+            # responsive while waiting for the next state
+            if receive is None:
+                receive = asyncio.ensure_future(client.receive())
+            await asyncio.wait((receive,), timeout=WATCH_POLL)
+            if any(event.type == pygame.QUIT for event in pygame.event.get()):
+                break
+            if not receive.done():
+                continue
+            state = receive.result()
+            receive = None
+            screen.fill((10, 10, 30))
+            bricks = [state.wall[slot] for slot in state.bricks]
+            atlas.blits(screen, [((RECT, width, height, color), (x, y)) for x, y, width, height, color, _ in bricks])
+            left, width = state.paddle
+            atlas.blits(screen, [((RECT, width, paddle.height, paddle.color), (left, paddle.rect.top))])
+            for x, y in state.balls:
+                pygame.draw.circle(screen, (255, 255, 255), (round(x * scale), round(y * scale)), round(10 * scale))
+            atlas.blits(screen, [((POWER_UP, PowerUp.width, PowerUp.height, PowerUp.PROPERTIES[type]['color'],
+                                   PowerUp.PROPERTIES[type]['char']), (left, top))
+                                 for type, left, top in state.power_ups])
+            atlas.blits(screen, [((RECT, Laser.width, Laser.height, Laser.color), laser) for laser in state.lasers])
+            hud = f"Score: {state.score}   Level: {state.level}   Lives: {state.lives}"
+            screen.blit(font.render(hud, True, (200, 200, 255)), (round(10 * scale), round(10 * scale)))
+            pygame.display.flip()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        print("the game closed the stream")
+    finally:
+        if receive is not None:
+            receive.cancel()
+        client.close()
+        pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a game streamed with main.py --serve")
+    parser.add_argument('address', nargs='?', default=f'127.0.0.1:{PORT}', help="host:port")
+    parser.add_argument('--scale', type=float, default=1, help="window size as a multiple of the game's")
+    args = parser.parse_args()
+    host, _, port = args.address.rpartition(':')
+    asyncio.run(watch(host or '127.0.0.1', int(port), args.scale))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import numpy as np
+import pygame
+
+from trails import circle_sprite
+
+# !!! PHASE: PARTICLE ENGINE !!!
+# All live particles are kept in parallel NumPy arrays (struct of arrays) and
+# moved in one batched step per frame. Dead particles are dropped by
+# compacting the arrays, never with a per-item list.remove().
+
+SHRINK_PER_FRAME = 0.1
+
+
+class ParticleSystem:
+    def __init__(self, capacity=1024, seed=None):
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.vx = np.zeros(capacity, np.float32)
+        self.vy = np.zeros(capacity, np.float32)
+        self.size = np.zeros(capacity, np.float32)
+        self.gravity = np.zeros(capacity, np.float32)
+        self.color = np.zeros((capacity, 3), np.uint8)
+
+    def _grow(self, capacity):
+        old = self._arrays()
+        self._allocate(capacity)
+        for new, prev in zip(self._arrays(), old):
+            new[:self.count] = prev[:self.count]
+
+    def _arrays(self):
+        return (self.x, self.y, self.vx, self.vy, self.size, self.gravity, self.color)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, count, x, y, color, min_size, max_size, min_speed, max_speed, gravity):
+        # Spawns `count` particles at (x, y) with random sizes and speeds in
+        # the given ranges. `color` is either one RGB tuple or a list of
+        # tuples to pick from per particle.
+        if count <= 0:
+            return
+        needed = self.count + count
+        if needed > self.capacity:
+            capacity = self.capacity
+            while capacity < needed:
+                capacity *= 2
+            self._grow(capacity)
+
+        new = slice(self.count, needed)
+        rng = self.rng
+        angle = np.radians(rng.uniform(0, 360, count))
+        speed = rng.uniform(min_speed, max_speed, count)
+        self.x[new] = x
+        self.y[new] = y
+        self.vx[new] = speed * np.cos(angle)
+        self.vy[new] = speed * np.sin(angle)
+        self.size[new] = rng.integers(min_size, max_size + 1, count)
+        self.gravity[new] = gravity
+        if isinstance(color[0], (tuple, list)):
+            palette = np.array(color, np.uint8)
+            self.color[new] = palette[rng.integers(0, len(palette), count)]
+        else:
+            self.color[new] = color
+        self.count = needed
+
+    def update(self):
+        n = self.count
+        if not n:
+            return
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.vy[:n] += self.gravity[:n]
+        self.size[:n] -= SHRINK_PER_FRAME
+
+        alive = self.size[:n] > 0
+        alive_count = int(np.count_nonzero(alive))
+        if alive_count != n:
+            for array in self._arrays():
+                array[:alive_count] = array[:n][alive]
+            self.count = alive_count
+
+    def draw(self, screen):
+        # Returns the bounding rect of everything drawn, or None
+        n = self.count
+        if not n:
+            return None
+        radius = self.size[:n].astype(np.int32)
+        visible = np.flatnonzero(radius > 0)
+        if not len(visible):
+            return None
+        radius = radius[visible]
+        color = self.color[visible].astype(np.int32)
+        # One key per (radius, color) pair, so each distinct sprite is looked up once
+        keys = (radius << 24) | (color[:, 0] << 16) | (color[:, 1] << 8) | color[:, 2]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        sprites = [circle_sprite(((key >> 16) & 255, (key >> 8) & 255, key & 255), key >> 24)
+                   for key in unique_keys.tolist()]
+        left = self.x[visible].astype(np.int32) - radius
+        top = self.y[visible].astype(np.int32) - radius
+        screen.blits([(sprites[i], (l, t)) for i, l, t in zip(inverse.tolist(), left.tolist(), top.tolist())],
+                     doreturn=False)
+        x0, y0 = int(left.min()), int(top.min())
+        x1, y1 = int((left + radius * 2).max()), int((top + radius * 2).max())
+        return pygame.Rect(x0, y0, x1 - x0, y1 - y0).clip(screen.get_rect())
+# !!! END PHASE: PARTICLE ENGINE !!!
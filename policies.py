@@ -0,0 +1,44 @@
+from engine import Inputs
+from trajectory import predict
+
+# !!! PHASE: AUTOPLAY POLICIES !!!
+# A policy plays the game instead of the keyboard: it is called with the
+# GameState every frame and returns that frame's Inputs. Policies used with
+# the batch runner must be module-level functions so worker processes can
+# import them by name.
+
+
+def idle(state):
+    return Inputs(space=True)
+
+
+def track_ball(state):
+    # Keeps the paddle under the lowest ball
+    paddle = state.paddle
+    ball = max(state.balls, key=_height) if len(state.balls) > 1 else state.ball
+    return Inputs(left=ball.rect.centerx < paddle.rect.centerx - 10,
+                  right=ball.rect.centerx > paddle.rect.centerx + 10,
+                  space=True)
+
+
+def _height(ball):
+    return ball.y
+
+
+def intercept(state):
+    # Waits where the next ball to come down will land, as long as no brick
+    # is in its way; otherwise follows the lowest ball like track_ball
+    paddle = state.paddle
+    best = None
+    for ball in state.balls:
+        prediction = predict(ball, paddle.rect.top - ball.radius, state.bricks, state.dt)
+        if prediction and prediction.brick is None and (best is None or prediction.time < best.time):
+            best = prediction
+    target = best.x if best else max(state.balls, key=_height).x
+    return Inputs(left=target < paddle.rect.centerx - 10, right=target > paddle.rect.centerx + 10, space=True)
+
+
+def track_ball_and_fire(state):
+    inputs = track_ball(state)
+    return inputs._replace(fire=state.paddle.has_laser and state.frame % 15 == 0)
+# !!! END PHASE: AUTOPLAY POLICIES !!!
@@ -0,0 +1,53 @@
+from itertools import islice
+
+# !!! PHASE: OBJECT POOLS !!!
+# Short-lived entities (bricks, power-ups, lasers, particles) are
+# recycled through free lists instead of being allocated and dropped, so
+# long sessions and laser storms do not keep feeding the garbage collector.
+# A pooled class uses __slots__ and has a spawn() method that takes the
+# constructor's arguments and (re)initialises the instance.
+
+POOLS = {}
+
+
+class ObjectPool:
+    def __init__(self, cls, name=None, limit=4096):
+        self.cls = cls
+        self.name = name or cls.__name__.lower()
+        # Free instances kept beyond this are left to the garbage collector
+        self.limit = limit
+        self.free = []
+        self.allocated = 0
+        self.reused = 0
+        POOLS[self.name] = self
+
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.spawn(*args)
+            self.reused += 1
+            return obj
+        self.allocated += 1
+        return self.cls(*args)
+
+    def release(self, obj):
+        # The caller must not touch obj afterwards
+        if len(self.free) < self.limit:
+            self.free.append(obj)
+
+    def release_all(self, objs):
+        self.free.extend(islice(objs, max(0, self.limit - len(self.free))))
+
+    def stats(self):
+        return {'allocated': self.allocated, 'reused': self.reused, 'free': len(self.free)}
+
+
+def pool_stats():
+    return {name: pool.stats() for name, pool in POOLS.items()}
+
+
+def pool_counts():
+    # Totals over every pool, for the profiler overlay
+    return {'allocated': sum(pool.allocated for pool in POOLS.values()),
+            'reused': sum(pool.reused for pool in POOLS.values())}
+# !!! END PHASE: OBJECT POOLS !!!
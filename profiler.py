@@ -0,0 +1,131 @@
+import csv
+import time
+
+import numpy as np
+import pygame
+
+from assets import ASSETS
+from text_cache import render_text
+
+# !!! PHASE: FRAME PROFILER !!!
+# Splits every frame into named phases. The loop calls lap(phase) after each
+# piece of work; the time since the previous lap is added to that phase.
+# The last `size` frames are kept in a ring buffer, and every frame also
+# lands in a per-phase histogram for the whole session.
+
+FRAME_BUDGET_MS = 1000 / 60
+# Upper edges of the small histogram buckets, in milliseconds; the budget,
+# twice it and four times it follow (the last bucket is open)
+HISTOGRAM_EDGES_MS = (0.25, 0.5, 1, 2, 4, 8)
+
+
+def histogram_edges(budget_ms):
+    small = tuple(edge for edge in HISTOGRAM_EDGES_MS if edge < budget_ms)
+    return small + (budget_ms, budget_ms * 2, budget_ms * 4)
+
+
+class FrameProfiler:
+    def __init__(self, phases, size=600, budget_ms=FRAME_BUDGET_MS):
+        # budget_ms is one frame at the target frame rate
+        self.phases = tuple(phases)
+        self.size = size
+        self.budget_ms = budget_ms
+        self.edges = histogram_edges(budget_ms)
+        self._column = {phase: i for i, phase in enumerate(self.phases)}
+        self.samples = np.zeros((size, len(self.phases)), np.float32)
+        self.histogram = np.zeros((len(self.phases), len(self.edges) + 1), np.int64)
+        self.frames = 0
+        self.counts = {}
+        self._current = np.zeros(len(self.phases), np.float32)
+        self._last = time.perf_counter()
+
+    def begin_frame(self):
+        self._current[:] = 0
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self._current[self._column[phase]] += (now - self._last) * 1000
+        self._last = now
+
+    def end_frame(self, counts=None):
+        self.samples[self.frames % self.size] = self._current
+        buckets = np.searchsorted(self.edges, self._current)
+        self.histogram[np.arange(len(self.phases)), buckets] += 1
+        self.frames += 1
+        if counts is not None:
+            self.counts = counts
+
+    def recent(self, frames=60):
+        # Most recent samples, oldest first
+        available = min(frames, self.frames, self.size)
+        end = self.frames % self.size
+        indices = np.arange(end - available, end) % self.size
+        return self.samples[indices]
+
+    def summary(self, frames=60):
+        recent = self.recent(frames)
+        if not len(recent):
+            return {phase: (0.0, 0.0) for phase in self.phases}
+        means, peaks = recent.mean(axis=0), recent.max(axis=0)
+        return {phase: (float(means[i]), float(peaks[i])) for i, phase in enumerate(self.phases)}
+
+    def export_csv(self, path):
+        # One row per buffered frame, then writes the session histogram next to it
+        first_frame = self.frames - min(self.frames, self.size)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', *self.phases, 'total'])
+            for offset, row in enumerate(self.recent(self.size)):
+                writer.writerow([first_frame + offset, *(f"{ms:.4f}" for ms in row), f"{row.sum():.4f}"])
+
+        histogram_path = path[:-4] + '_histogram.csv' if path.endswith('.csv') else path + '_histogram'
+        with open(histogram_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            edges = [f"<={edge:.4g}ms" for edge in self.edges] + [f">{self.edges[-1]:.4g}ms"]
+            writer.writerow(['phase', *edges])
+            for phase, row in zip(self.phases, self.histogram):
+                writer.writerow([phase, *row.tolist()])
+        return path, histogram_path
+
+
+class ProfilerOverlay:
+    def __init__(self, profiler, font=None):
+        self.profiler = profiler
+        self.font = font
+        self.visible = False
+        self._lines = []
+        self._refreshed_at = None
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def draw(self, screen, skip=('idle',)):
+        # Returns the rect it covered. Text is refreshed a few times a second
+        # so the numbers stay readable and aren't re-rendered every frame.
+        if self._refreshed_at is None or self.profiler.frames - self._refreshed_at >= 10:
+            self._lines = self._build_lines(skip)
+            self._refreshed_at = self.profiler.frames
+        lines = self._lines
+        font = self.font or ASSETS.font(20)
+        line_height = font.get_linesize()
+        panel = pygame.Rect(10, 45, 230, line_height * len(lines) + 10)
+        shade = pygame.Surface(panel.size)
+        shade.set_alpha(180)
+        screen.blit(shade, panel)
+        for i, (text, color) in enumerate(lines):
+            screen.blit(render_text(font, text, color), (panel.x + 5, panel.y + 5 + i * line_height))
+        return panel
+
+    def _build_lines(self, skip):
+        summary = self.profiler.summary()
+        busy = sum(mean for phase, (mean, _) in summary.items() if phase not in skip)
+        budget = self.profiler.budget_ms
+        over_budget = busy > budget
+        lines = [(f"frame {busy:6.2f} ms / {budget:.1f}", (255, 120, 120) if over_budget else (150, 255, 150))]
+        for phase, (mean, peak) in summary.items():
+            lines.append((f"{phase:<12}{mean:6.2f} avg {peak:6.2f} max", (220, 220, 255)))
+        for name, count in self.profiler.counts.items():
+            lines.append((f"{name:<12}{count:>6}", (200, 200, 200)))
+        return lines
+# !!! END PHASE: FRAME PROFILER !!!
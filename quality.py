@@ -0,0 +1,71 @@
+from collections import deque, namedtuple
+
+# !!! PHASE: QUALITY GOVERNOR !!!
+# Trades effects for frame rate on machines that cannot keep up. The loop
+# reports how long each frame took to produce (not counting the wait for the
+# next one); when the average over a window goes over the frame budget the
+# governor drops one quality level, and once there is plenty of headroom
+# for a good while it climbs back one. Raising waits much longer than
+# lowering, so a level that only just fits is not retried every second.
+
+Quality = namedtuple('Quality', ['name', 'particles', 'trail', 'meteors', 'star_layers'])
+
+# Best first. particles scales every particle burst, trail is Ball.max_trail,
+# meteors the meteor spawn chance, star_layers how many starfield layers
+# are drawn (the densest, farthest ones go first).
+LEVELS = (
+    Quality('high', 1.0, 15, 0.08, 3),
+    Quality('medium', 0.6, 10, 0.05, 3),
+    Quality('low', 0.3, 6, 0.02, 2),
+    Quality('minimal', 0.1, 0, 0.0, 1),
+)
+
+
+class QualityGovernor:
+    def __init__(self, budget_ms=1000 / 60, window=30, lower_above=1.0, raise_below=0.6, raise_after=300):
+        self.budget_ms = budget_ms
+        self.samples = deque(maxlen=window)
+        # Average frame times that trigger a change, in milliseconds
+        self.lower_above = budget_ms * lower_above
+        self.raise_below = budget_ms * raise_below
+        # Frames at one level before it may be raised
+        self.raise_after = raise_after
+        self.adaptive = True
+        self.level = 0
+        self.frames_at_level = 0
+        self.changes = 0
+
+    @property
+    def quality(self):
+        return LEVELS[self.level]
+
+    def update(self, frame_ms):
+        # Called once per frame; True when the level changed
+        if not self.adaptive:
+            return False
+        self.samples.append(frame_ms)
+        self.frames_at_level += 1
+        if len(self.samples) < self.samples.maxlen:
+            return False
+        average = sum(self.samples) / len(self.samples)
+        if average > self.lower_above and self.level < len(LEVELS) - 1:
+            self.level += 1
+        elif average < self.raise_below and self.level > 0 and self.frames_at_level >= self.raise_after:
+            self.level -= 1
+        else:
+            return False
+        # Judge the new level on its own frames only
+        self.samples.clear()
+        self.frames_at_level = 0
+        self.changes += 1
+        return True
+
+    def fix(self, name):
+        # Stays at the named level from now on
+        self.level = [quality.name for quality in LEVELS].index(name)
+        self.adaptive = False
+
+    def particles(self, count):
+        # How many of a burst of `count` particles to emit
+        return round(count * self.quality.particles)
+# !!! END PHASE: QUALITY GOVERNOR !!!
@@ -0,0 +1,87 @@
+import pygame
+
+from atlas import ATLAS
+
+# !!! PHASE: DIRTY RECT RENDERING !!!
+# The background and the brick wall are baked into one cached surface that
+# only changes when a brick breaks (or a restored snapshot brings it back). Each frame only the areas touched by
+# moving things are restored from that surface, redrawn and pushed to the
+# display with pygame.display.update(rects) instead of a full flip.
+
+
+class DirtyRectRenderer:
+    def __init__(self, screen, bg_color):
+        self.screen = screen
+        self.bg_color = bg_color
+        self.background = pygame.Surface(screen.get_size())
+        if pygame.display.get_surface() is not None:
+            self.background = self.background.convert()
+        self.background.fill(bg_color)
+        self._bricks = None
+        self._version = None
+        # Each baked brick and where it was drawn
+        self._baked = {}
+        self._previous = []
+        self._current = []
+        self._full = True
+
+    def invalidate(self):
+        # Next frame repaints and presents the whole screen
+        self._full = True
+
+    def begin(self):
+        self._current = []
+        if self._full:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self._previous:
+                self.screen.blit(self.background, rect, rect)
+
+    def add(self, rect):
+        if rect:
+            self._current.append(rect)
+
+    def present(self):
+        if self._full:
+            pygame.display.flip()
+            self._full = False
+        else:
+            pygame.display.update(self._previous + self._current)
+        # What was drawn this frame has to be erased at the start of the next one
+        self._previous = self._current
+
+    def draw_bricks(self, bricks, version=None):
+        # Stands in for drawing every brick: the wall is already on the
+        # background, so only bricks that disappeared or came back need
+        # touching. `version` is GameState.bricks_changed; without it the
+        # wall is compared with the baked one every frame. Call it before
+        # drawing anything else in the frame.
+        if bricks is not self._bricks:
+            # A new wall (new game or level): bake it from scratch
+            self._bricks = bricks
+            self._version = version
+            self._baked = {brick: brick.rect.copy() for brick in bricks}
+            self.background.fill(self.bg_color)
+            ATLAS.draw(self.background, self._baked)
+            self.screen.blit(self.background, (0, 0))
+            self._full = True
+        elif version is None or version != self._version:
+            # Bricks break, and a restored snapshot can put them back
+            self._version = version
+            baked = self._baked
+            current = set(bricks)
+            removed = [brick for brick in baked if brick not in current]
+            added = [brick for brick in current if brick not in baked]
+            # Pooled bricks can be recycled before the frame is presented, so
+            # erase where each brick was baked and only keep copies of rects
+            rects = [baked.pop(brick) for brick in removed]
+            for rect in rects:
+                self.background.fill(self.bg_color, rect)
+            for brick in added:
+                baked[brick] = brick.rect.copy()
+                rects.append(baked[brick])
+            ATLAS.draw(self.background, added)
+            for rect in rects:
+                self.screen.blit(self.background, rect, rect)
+            self._current.extend(rect.copy() for rect in rects)
+# !!! END PHASE: DIRTY RECT RENDERING !!!
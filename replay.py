@@ -0,0 +1,216 @@
+import argparse
+import struct
+import sys
+import time
+
+from engine import GameState, Inputs, STEP_RATE
+from levelpack import LevelPack
+
+# !!! PHASE: REPLAYS !!!
+# A game is fully determined by its seed, its stress-mode extra balls and
+# the inputs of every frame, so that is all a replay stores. Inputs are 4
+# bits per frame and are run-length encoded, so a run of identical frames
+# costs one byte however short it is, and long stretches of held keys only
+# a few bytes.
+#
+# File layout (little endian):
+#   header  magic 'ARKR', version u8, width u16, height u16, step rate u16,
+#           extra balls u16, seed u64, level pack digest u64 (0: none),
+#           steps u32, final score u32, final level u16, final lives i16
+#   body    one byte per run: input bits in the low nibble, run length - 1
+#           in the high nibble; a high nibble of 15 means the run is longer
+#           and (run length - 16) follows as a varint
+
+MAGIC = b'ARKR'
+# Version 2: the multi-ball power-up changed what every seed plays out as.
+# Version 3: the simulation step rate is recorded.
+# Version 4: the stress-mode extra balls are recorded.
+# Version 5: the level pack is recorded.
+VERSION = 5
+HEADER = struct.Struct('<4sBHHHHQQIIHh')
+NO_PACK = 0
+
+LEFT, RIGHT, SPACE, FIRE = 1, 2, 4, 8
+# Longest run that fits in the high nibble of a run byte
+LONG_RUN = 15
+
+
+def pack_inputs(inputs):
+    return ((LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) |
+            (SPACE if inputs.space else 0) | (FIRE if inputs.fire else 0))
+
+
+def unpack_inputs(bits):
+    return Inputs(bool(bits & LEFT), bool(bits & RIGHT), bool(bits & SPACE), bool(bits & FIRE))
+
+
+class ReplayLog:
+    def __init__(self, seed, width, height, frames=None, score=0, level=1, lives=0, step_rate=STEP_RATE,
+                 balls=0, pack=NO_PACK):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.step_rate = step_rate
+        # Extra balls added with GameState.add_balls() before the first step
+        self.balls = balls
+        # LevelPack.digest() of the pack the game was played with
+        self.pack = pack
+        self.frames = frames if frames is not None else []
+        self.score = score
+        self.level = level
+        self.lives = lives
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.width, self.height, self.step_rate, self.balls,
+                                    self.seed, self.pack, len(self.frames), self.score, self.level, self.lives))
+        previous, run = None, 0
+        for bits in self.frames:
+            if bits == previous:
+                run += 1
+                continue
+            if run:
+                _write_run(out, previous, run)
+            previous, run = bits, 1
+        if run:
+            _write_run(out, previous, run)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        (magic, version, width, height, step_rate, balls, seed, pack,
+         count, score, level, lives) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not an Arkanoid replay")
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+        frames = []
+        offset = HEADER.size
+        while offset < len(data):
+            byte = data[offset]
+            offset += 1
+            bits, run = byte & 0x0f, (byte >> 4) + 1
+            if run > LONG_RUN:
+                extra, offset = _read_varint(data, offset)
+                run += extra
+            frames.extend([bits] * run)
+        if len(frames) != count:
+            raise ValueError(f"replay is truncated: {len(frames)} of {count} frames")
+        return cls(seed, width, height, frames, score, level, lives, step_rate, balls, pack)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def inputs(self):
+        for bits in self.frames:
+            yield unpack_inputs(bits)
+
+
+def _write_run(out, bits, run):
+    if run <= LONG_RUN:
+        out.append(bits | (run - 1) << 4)
+        return
+    out.append(bits | 0xf0)
+    run -= LONG_RUN + 1
+    while run >= 0x80:
+        out.append((run & 0x7f) | 0x80)
+        run >>= 7
+    out.append(run)
+
+
+def _read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class InputRecorder:
+    # Records a game from GameState.reset() and add_balls(balls) onwards
+    def __init__(self, state, balls=0):
+        self.state = state
+        pack = state.level_pack.digest() if state.level_pack is not None else NO_PACK
+        self.log = ReplayLog(state.seed, state.screen_width, state.screen_height, step_rate=state.step_rate,
+                             balls=balls, pack=pack)
+
+    def record(self, inputs):
+        self.log.frames.append(pack_inputs(inputs))
+
+    def finish(self):
+        self.log.score = self.state.score
+        self.log.level = self.state.level
+        self.log.lives = self.state.lives
+        return self.log
+
+
+def check_level_pack(log, level_pack):
+    # A game recorded with a level pack needs the same pack to replay
+    digest = level_pack.digest() if level_pack is not None else NO_PACK
+    if digest == log.pack:
+        return
+    if log.pack == NO_PACK:
+        raise ValueError("the replay was recorded without a level pack, replay it without --levels")
+    if level_pack is None:
+        raise ValueError(f"the replay was recorded with a level pack (digest {log.pack:016x}), pass it with --levels")
+    raise ValueError(f"the replay was recorded with another level pack (digest {log.pack:016x}, "
+                     f"{level_pack.path} is {digest:016x})")
+
+
+def play_headless(log, level_pack=None):
+    # Re-runs the game as fast as possible, at the recorded step rate, and
+    # returns the final state
+    check_level_pack(log, level_pack)
+    state = GameState(log.width, log.height, seed=log.seed, level_pack=level_pack, step_rate=log.step_rate)
+    state.add_balls(log.balls)
+    step = state.step
+    for inputs in log.inputs():
+        step(inputs)
+    return state
+
+
+def verify(log, state):
+    # List of mismatches between a replayed state and the recorded result
+    problems = []
+    for name in ('score', 'level', 'lives'):
+        recorded, replayed = getattr(log, name), getattr(state, name)
+        if recorded != replayed:
+            problems.append(f"{name}: recorded {recorded}, replayed {replayed}")
+    return problems
+# !!! END PHASE: REPLAYS !!!
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded game headless at full speed")
+    parser.add_argument('path')
+    parser.add_argument('--levels', metavar='PATH', help="level pack the game was played with")
+    args = parser.parse_args()
+
+    log = ReplayLog.load(args.path)
+    start = time.perf_counter()
+    try:
+        state = play_headless(log, LevelPack(args.levels) if args.levels else None)
+    except ValueError as error:
+        sys.exit(f"{args.path}: {error}")
+    elapsed = time.perf_counter() - start
+    print(f"seed {log.seed}, {len(log.frames)} frames replayed in {elapsed:.3f}s "
+          f"({len(log.frames) / max(elapsed, 1e-9):,.0f} frames/s)")
+    print(f"score {state.score}, level {state.level}, lives {state.lives}")
+    problems = verify(log, state)
+    for problem in problems:
+        print("MISMATCH", problem)
+    if problems:
+        sys.exit(1)
+    print("replay matches the recording")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+from game_objects import Ball, BRICKS, POWER_UPS, LASERS
+from spatial import BrickGrid
+
+# !!! PHASE: SNAPSHOTS !!!
+# A snapshot is everything GameState.step() reads, copied into flat tuples,
+# so search bots and rollback can try a move, look at the outcome and put
+# the game back. Bricks are most of a game, so each level's bricks are
+# recorded once in a Wall and a snapshot only keeps a bitmask of the ones
+# still standing and a byte of hit points per brick. Snapshots that no brick
+# changed between share those (the state counts brick changes), and a
+# restore only adds or removes the bricks that differ. Trails and particles
+# only decorate the screen and are left as they are.
+
+
+class Wall:
+    # One level's bricks, indexed by their order in the grid
+    def __init__(self, grid):
+        # The live grid these bricks are in; a restore into any other grid
+        # builds a new one
+        self.grid = grid
+        self.cell_size = (grid.cell_width, grid.cell_height)
+        self.origin = (grid.origin_x, grid.origin_y)
+        self.bricks = [None] * grid._next_order
+        for brick, order in grid._order.items():
+            rect = brick.rect
+            self.bricks[order] = (rect.x, rect.y, rect.width, rect.height, brick.color, brick.breakable)
+        # The grid's bricks as of state.bricks_changed == version
+        self.version = None
+        self.alive = 0
+        self.hit_points = b''
+
+
+class Snapshot:
+    __slots__ = ('seed', 'rng', 'frame', 'score', 'lives', 'level', 'status',
+                 'paddle', 'balls', 'power_ups', 'lasers', 'wall', 'alive', 'hit_points')
+
+
+def take_snapshot(state):
+    snapshot = Snapshot()
+    snapshot.seed = state.seed
+    snapshot.rng = state.rng.getstate()
+    snapshot.frame = state.frame
+    snapshot.score = state.score
+    snapshot.lives = state.lives
+    snapshot.level = state.level
+    snapshot.status = state.status
+
+    paddle = state.paddle
+    timers = paddle.power_up_timers
+    snapshot.paddle = (paddle.rect.x, paddle.width, paddle.x, paddle.prev_x, timers['grow'], timers['laser'],
+                       timers['glue'], paddle.has_laser, paddle.has_glue)
+    snapshot.balls = tuple((ball.x, ball.y, ball.prev_x, ball.prev_y, ball.rect.centerx, ball.rect.centery,
+                            ball.speed_x, ball.speed_y, ball.is_glued, ball.is_slowed, ball.slow_timer)
+                           for ball in state.balls)
+    snapshot.power_ups = tuple((power_up.type, power_up.rect.x, power_up.rect.y, power_up.y, power_up.prev_y)
+                               for power_up in state.power_ups)
+    snapshot.lasers = tuple((laser.rect.x, laser.rect.y, laser.y, laser.prev_y) for laser in state.lasers)
+
+    wall = state.wall
+    if wall is None or wall.grid is not state.bricks:
+        wall = state.wall = Wall(state.bricks)
+    if wall.version != state.bricks_changed:
+        alive = 0
+        hit_points = bytearray(len(wall.bricks))
+        for brick, order in state.bricks._order.items():
+            alive |= 1 << order
+            hit_points[order] = brick.hit_points
+        wall.alive, wall.hit_points, wall.version = alive, bytes(hit_points), state.bricks_changed
+    snapshot.wall, snapshot.alive, snapshot.hit_points = wall, wall.alive, wall.hit_points
+    return snapshot
+
+
+def restore_snapshot(state, snapshot):
+    state.seed = snapshot.seed
+    state.frame = snapshot.frame
+    state.score = snapshot.score
+    state.lives = snapshot.lives
+    state.level = snapshot.level
+    state.status = snapshot.status
+
+    paddle = state.paddle
+    timers = paddle.power_up_timers
+    (paddle.rect.x, paddle.width, paddle.x, paddle.prev_x, timers['grow'], timers['laser'], timers['glue'],
+     paddle.has_laser, paddle.has_glue) = snapshot.paddle
+    paddle.rect.width = paddle.width
+
+    balls = state.balls
+    del balls[len(snapshot.balls):]
+    while len(balls) < len(snapshot.balls):
+        balls.append(Ball(state.screen_width, state.screen_height, state.rng))
+    for ball, values in zip(balls, snapshot.balls):
+        (ball.x, ball.y, ball.prev_x, ball.prev_y, center_x, center_y, ball.speed_x, ball.speed_y,
+         ball.is_glued, ball.is_slowed, ball.slow_timer) = values
+        ball.rect.center = (center_x, center_y)
+        ball.bricks_hit = []
+
+    POWER_UPS.release_all(state.power_ups)
+    state.power_ups[:] = [_power_up(*values) for values in snapshot.power_ups]
+    LASERS.release_all(state.lasers)
+    state.lasers[:] = [_laser(*values) for values in snapshot.lasers]
+
+    _restore_bricks(state, snapshot)
+    # Last: new balls above drew from the generator
+    state.rng.setstate(snapshot.rng)
+
+
+def _power_up(type, left, top, y, prev_y):
+    power_up = POWER_UPS.acquire(left, top, type)
+    power_up.y, power_up.prev_y = y, prev_y
+    return power_up
+
+
+def _laser(left, top, y, prev_y):
+    laser = LASERS.acquire(left, top)
+    laser.y, laser.prev_y = y, prev_y
+    return laser
+
+
+def _restore_bricks(state, snapshot):
+    wall, grid = snapshot.wall, state.bricks
+    if wall.grid is grid:
+        if wall.version == state.bricks_changed:
+            if wall.alive == snapshot.alive and wall.hit_points == snapshot.hit_points:
+                return
+            standing = wall.alive
+        else:
+            standing = 0
+            for order in grid._order.values():
+                standing |= 1 << order
+    else:
+        # Another level, or another game: start from an empty grid
+        state.dead_bricks.extend(grid)
+        grid = state.bricks = wall.grid = BrickGrid(*wall.cell_size, origin=wall.origin)
+        standing = 0
+
+    alive, hit_points = snapshot.alive, snapshot.hit_points
+    for brick, order in list(grid._order.items()):
+        if alive >> order & 1:
+            brick.hit_points = hit_points[order]
+        else:
+            grid.remove(brick)
+            state.dead_bricks.append(brick)
+    # Bricks broken since come back as fresh ones from the pool: the old
+    # ones are already on their way back to it
+    missing = alive & ~standing
+    while missing:
+        order = (missing & -missing).bit_length() - 1
+        missing &= missing - 1
+        x, y, width, height, color, breakable = wall.bricks[order]
+        grid.add(BRICKS.acquire(x, y, width, height, color, hit_points[order], breakable), order)
+
+    state.bricks_changed += 1
+    state.wall = wall
+    wall.alive, wall.hit_points, wall.version = alive, hit_points, state.bricks_changed
+# !!! END PHASE: SNAPSHOTS !!!
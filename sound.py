@@ -0,0 +1,120 @@
+import pygame
+
+from assets import SilentSound
+
+# !!! PHASE: SOUND SCHEDULER !!!
+# Gameplay code asks for sounds with play(); nothing reaches the mixer until
+# flush() runs once at the end of the frame. Requests for the same sound in
+# one frame are merged into a single voice, and voices come from a fixed
+# pool of reserved channels. When every channel is busy, the lowest-priority
+# (then oldest) voice is stolen, but only for a request that is at least as
+# important. Muting is a master volume on those channels.
+
+
+class SoundScheduler:
+    def __init__(self, assets, voices=8, volumes=None, priorities=None):
+        self.assets = assets
+        self.voices = voices
+        self.volumes = volumes or {}
+        self.priorities = priorities or {}
+        self.muted = False
+        self.master_volume = 1.0
+        self.stats = {'requested': 0, 'merged': 0, 'played': 0, 'stolen': 0, 'dropped': 0}
+        self._pending = {}
+        self._channels = None
+        self._playing = []
+        self._prepared = set()
+        self._serial = 0
+
+    def play(self, name, priority=None, loops=0):
+        self.stats['requested'] += 1
+        if priority is None:
+            priority = self.priorities.get(name, 0)
+        pending = self._pending.get(name)
+        if pending is None:
+            self._pending[name] = [priority, loops]
+        else:
+            self.stats['merged'] += 1
+            pending[0] = max(pending[0], priority)
+            if loops == -1:
+                pending[1] = -1
+
+    def stop(self, name):
+        self._pending.pop(name, None)
+        for index, voice in enumerate(self._playing):
+            if voice and voice[0] == name:
+                self._channels[index].stop()
+                self._playing[index] = None
+
+    def set_muted(self, muted):
+        self.muted = muted
+        for channel in self._channels or ():
+            channel.set_volume(self._channel_volume())
+
+    def flush(self):
+        if not self._pending:
+            return
+        requests = sorted(self._pending.items(), key=lambda item: -item[1][0])
+        self._pending.clear()
+        channels = self._setup()
+        if not channels:
+            self.stats['dropped'] += len(requests)
+            return
+
+        for name, (priority, loops) in requests:
+            sound = self._sound(name)
+            if isinstance(sound, SilentSound):
+                # Missing file: nothing to play
+                self.stats['dropped'] += 1
+                continue
+            index = self._pick_channel(priority)
+            if index is None:
+                self.stats['dropped'] += 1
+                continue
+            channel = channels[index]
+            channel.play(sound, loops=loops)
+            channel.set_volume(self._channel_volume())
+            self._serial += 1
+            self._playing[index] = (name, priority, self._serial)
+            self.stats['played'] += 1
+
+    def _pick_channel(self, priority):
+        victim = None
+        for index, channel in enumerate(self._channels):
+            if not channel.get_busy():
+                self._playing[index] = None
+                return index
+            voice = self._playing[index]
+            # Channels busy with something we didn't start count as most important
+            key = (voice[1], voice[2]) if voice else (float('inf'), 0)
+            if victim is None or key < victim[0]:
+                victim = (key, index)
+        if victim is not None and victim[0][0] <= priority:
+            self._channels[victim[1]].stop()
+            self.stats['stolen'] += 1
+            return victim[1]
+        return None
+
+    def _sound(self, name):
+        sound = self.assets.sound(name)
+        if name not in self._prepared:
+            sound.set_volume(self.volumes.get(name, 1.0))
+            self._prepared.add(name)
+        return sound
+
+    def _channel_volume(self):
+        return 0.0 if self.muted else self.master_volume
+
+    def _setup(self):
+        if self._channels is None:
+            self._channels = []
+            if self.assets.audio_ready():
+                if pygame.mixer.get_num_channels() < self.voices:
+                    pygame.mixer.set_num_channels(self.voices)
+                # Reserved channels are never picked by Sound.play(), so
+                # nothing outside the scheduler can take our voices
+                pygame.mixer.set_reserved(self.voices)
+                self._channels = [pygame.mixer.Channel(i) for i in range(self.voices)]
+                self._playing = [None] * self.voices
+        return self._channels
+# !!! END PHASE: SOUND SCHEDULER !!!
@@ -0,0 +1,87 @@
+# !!! PHASE: SPATIAL INDEX !!!
+# Bricks are bucketed into fixed-size grid cells, so a collision query only
+# looks at the few cells the moving rect overlaps instead of every brick.
+
+
+class BrickGrid:
+    def __init__(self, cell_width, cell_height, origin=(0, 0)):
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.origin_x, self.origin_y = origin
+        self.cells = {}
+        # Insertion order doubles as the "list order" of the old brick list:
+        # when several bricks are hit at once, the earliest one wins.
+        self._order = {}
+        self._next_order = 0
+        # Bricks that can still be broken; the level is cleared at zero
+        self.breakable = 0
+        # Box around every brick ever added (it does not shrink on removal),
+        # so a ball far from the wall can skip the grid altogether
+        self.bounds = None
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(list(self._order))
+
+    def __contains__(self, brick):
+        return brick in self._order
+
+    def add(self, brick, order=None):
+        # order puts a brick back into the slot it had before (snapshots)
+        if order is None:
+            order = self._next_order
+        self._order[brick] = order
+        self._next_order = max(self._next_order, order + 1)
+        if brick.breakable:
+            self.breakable += 1
+        self.bounds = brick.rect.copy() if self.bounds is None else self.bounds.union(brick.rect)
+        for cell in self._cells_for(brick.rect):
+            self.cells.setdefault(cell, {})[brick] = None
+
+    def remove(self, brick):
+        del self._order[brick]
+        if brick.breakable:
+            self.breakable -= 1
+        for cell in self._cells_for(brick.rect):
+            bucket = self.cells[cell]
+            del bucket[brick]
+            if not bucket:
+                del self.cells[cell]
+
+    def query(self, rect):
+        # Every brick overlapping rect, in insertion order
+        hits = set()
+        for cell in self._cells_for(rect):
+            bucket = self.cells.get(cell)
+            if bucket:
+                for brick in bucket:
+                    if rect.colliderect(brick.rect):
+                        hits.add(brick)
+        return sorted(hits, key=self._order.__getitem__)
+
+    def first_hit(self, rect):
+        best = None
+        best_order = None
+        for cell in self._cells_for(rect):
+            bucket = self.cells.get(cell)
+            if bucket:
+                for brick in bucket:
+                    if rect.colliderect(brick.rect):
+                        order = self._order[brick]
+                        if best is None or order < best_order:
+                            best, best_order = brick, order
+        return best
+
+    def _cells_for(self, rect):
+        if rect.width <= 0 or rect.height <= 0:
+            return ()
+        first_col = (rect.left - self.origin_x) // self.cell_width
+        last_col = (rect.right - 1 - self.origin_x) // self.cell_width
+        first_row = (rect.top - self.origin_y) // self.cell_height
+        last_row = (rect.bottom - 1 - self.origin_y) // self.cell_height
+        return [(col, row)
+                for row in range(first_row, last_row + 1)
+                for col in range(first_col, last_col + 1)]
+# !!! END PHASE: SPATIAL INDEX !!!
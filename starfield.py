@@ -0,0 +1,213 @@
+import functools
+import math
+import random
+
+import numpy as np
+import pygame
+
+from trails import circle_sprite
+
+# !!! PHASE: STARFIELD !!!
+# The menu background. A layer of stars that does not twinkle is baked once
+# into one screen-sized RLE colorkeyed surface in the display format, so it
+# costs one or two blits a frame however many stars it holds. Twinkling
+# stars are drawn from a handful of precomputed sprites per star size, one
+# per twinkle frame, each already blended against the background at that
+# frame's brightness; a layer's batch is rebuilt only when its twinkle frame
+# or scroll position changes and drawn with one blits() call. Meteors all
+# live in one set of arrays and are drawn with a single blits() call.
+
+# stars, radius, drift in pixels per frame, dimmest and brightest alpha, twinkles
+LAYERS = (
+    (700, 1, 0.05, 50, 120, False),
+    (240, 1, 0.15, 90, 200, True),
+    (70, 2, 0.35, 100, 255, True),
+)
+TWINKLE_FRAMES = 6
+# Frames for a star to go from bright to dim and back
+TWINKLE_PERIOD = 150
+STAR_COLOR = (255, 255, 255)
+
+
+class StarLayer:
+    def __init__(self, speed, count, surface=None, sprites=None, x=None, y=None, phase=None):
+        self.speed = speed
+        self.count = count
+        # A layer that does not twinkle is one baked surface; one that does
+        # is a sprite per twinkle frame and each star's position and phase
+        self.surface = surface
+        self.sprites = sprites
+        self.x = x
+        self.y = y
+        self.phase = phase
+        self._batch = None
+        self._batch_key = None
+
+    def batch(self, frame, offset, width):
+        if self._batch_key != (frame, offset):
+            sprites = self.sprites
+            x = ((self.x - offset) % width).tolist()
+            index = ((self.phase + frame) % len(sprites)).tolist()
+            self._batch = [(sprites[i], (left, top)) for i, left, top in zip(index, x, self.y)]
+            self._batch_key = (frame, offset)
+        return self._batch
+
+
+class Starfield:
+    def __init__(self, width, height, bg_color, layers=LAYERS, seed=None):
+        self.width = width
+        self.height = height
+        self.bg_color = tuple(bg_color)[:3]
+        self.rng = random.Random(seed)
+        self.tick = 0
+        self.layers = [self._bake(*layer) for layer in layers]
+        # Only the last (nearest) this many layers are drawn
+        self.shown = len(self.layers)
+
+    def __len__(self):
+        return sum(layer.count for layer in self._shown_layers())
+
+    def _shown_layers(self):
+        return self.layers[len(self.layers) - self.shown:]
+
+    def _star_color(self, dim, bright, level):
+        alpha = (dim + (bright - dim) * level) / 255
+        return tuple(round(bg + (star - bg) * alpha) for bg, star in zip(self.bg_color, STAR_COLOR))
+
+    def _bake(self, count, radius, speed, dim, bright, twinkles):
+        rng = self.rng
+        stars = [(rng.randint(radius, self.width - radius), rng.randint(radius, self.height - radius),
+                  rng.random()) for _ in range(count)]
+        if twinkles:
+            levels = [0.5 + 0.5 * math.cos(2 * math.pi * frame / TWINKLE_FRAMES) for frame in range(TWINKLE_FRAMES)]
+            sprites = [_display_format(circle_sprite(self._star_color(dim, bright, level), radius))
+                       for level in levels]
+            return StarLayer(speed, count, sprites=sprites,
+                             x=np.array([x - radius for x, _, _ in stars]),
+                             y=[y - radius for _, y, _ in stars],
+                             phase=np.array([int(phase * TWINKLE_FRAMES) for _, _, phase in stars]))
+        surface = pygame.Surface((self.width, self.height))
+        for x, y, phase in stars:
+            pygame.draw.circle(surface, self._star_color(dim, bright, phase), (x, y), radius)
+        # Black is never a star color: it is left transparent
+        surface.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        return StarLayer(speed, count, surface=_display_format(surface))
+
+    def update(self):
+        self.tick += 1
+
+    def draw(self, screen):
+        # Menus redraw the whole screen, so no dirty rect is returned
+        current = self.tick * TWINKLE_FRAMES // TWINKLE_PERIOD
+        for layer in self._shown_layers():
+            offset = int(self.tick * layer.speed) % self.width
+            if layer.surface is None:
+                screen.blits(layer.batch(current, offset, self.width), doreturn=False)
+                continue
+            screen.blit(layer.surface, (-offset, 0))
+            if offset:
+                screen.blit(layer.surface, (self.width - offset, 0))
+
+
+def _display_format(surface):
+    # A copy in the display's pixel format, keeping the colorkey, once a
+    # display exists
+    if pygame.display.get_surface() is None:
+        return surface
+    converted = surface.convert()
+    converted.set_colorkey(surface.get_colorkey(), pygame.RLEACCEL)
+    return converted
+
+
+class MeteorShower:
+    def __init__(self, width, height, spawn_chance=0.08, trail_length=15, capacity=64, seed=None):
+        self.width = width
+        self.height = height
+        self.spawn_chance = spawn_chance
+        self.trail_length = trail_length
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.vx = np.zeros(capacity, np.float32)
+        self.vy = np.zeros(capacity, np.float32)
+        self.radius = np.zeros(capacity, np.int32)
+        # Every meteor's trail is a row of one shared ring buffer; the ring
+        # position moves on once per update for all of them
+        self.trail = np.zeros((capacity, trail_length, 2), np.int32)
+        self.trail_used = np.zeros(capacity, np.int32)
+        self._ring = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def spawn(self):
+        if self.count == self.capacity:
+            return
+        rng, i = self.rng, self.count
+        angle = rng.uniform(0, 2 * math.pi)
+        speed = rng.uniform(2, 5)
+        self.x[i] = rng.integers(0, self.width, endpoint=True)
+        self.y[i] = rng.integers(0, self.height, endpoint=True)
+        self.vx[i] = math.cos(angle) * speed
+        self.vy[i] = math.sin(angle) * speed
+        self.radius[i] = rng.integers(2, 4, endpoint=True)
+        self.trail_used[i] = 0
+        self.count += 1
+
+    def update(self):
+        if self.rng.random() < self.spawn_chance:
+            self.spawn()
+        n = self.count
+        if not n:
+            return
+        x, y = self.x[:n], self.y[:n]
+        x += self.vx[:n]
+        y += self.vy[:n]
+        self.trail[:n, self._ring, 0] = x
+        self.trail[:n, self._ring, 1] = y
+        self._ring = (self._ring + 1) % self.trail_length
+        np.minimum(self.trail_used[:n] + 1, self.trail_length, out=self.trail_used[:n])
+
+        alive = (x >= -20) & (x <= self.width + 20) & (y >= -20) & (y <= self.height + 20)
+        if not alive.all():
+            keep = np.flatnonzero(alive)
+            for array in (self.x, self.y, self.vx, self.vy, self.radius, self.trail, self.trail_used):
+                array[:len(keep)] = array[keep]
+            self.count = len(keep)
+
+    def draw(self, screen):
+        n = self.count
+        if not n:
+            return
+        length = self.trail_length
+        used = self.trail_used[:n, None]
+        age = np.arange(length)
+        # The i-th oldest point of each trail, oldest first like Trail
+        columns = (self._ring - used + age) % length
+        meteor, index = np.nonzero(age < used)
+        points = self.trail[meteor, columns[meteor, index]]
+        # Flat lists of ints: a list per point would feed the garbage
+        # collector thousands of containers a frame
+        sprites = [meteor_trail_sprites(radius, length)[i]
+                   for radius, i in zip(self.radius[meteor].tolist(), index.tolist())]
+        offsets = [sprite.get_width() // 2 for sprite in sprites]
+        batch = [(sprite, (x - half, y - half)) for sprite, half, x, y
+                 in zip(sprites, offsets, points[:, 0].tolist(), points[:, 1].tolist())]
+        for radius, x, y in zip(self.radius[:n].tolist(), self.x[:n].tolist(), self.y[:n].tolist()):
+            batch.append((circle_sprite(STAR_COLOR, radius), (int(x) - radius, int(y) - radius)))
+        screen.blits(batch, doreturn=False)
+
+
+@functools.lru_cache(maxsize=None)
+def meteor_trail_sprites(radius, length):
+    sprites = []
+    for i in range(length):
+        fade = max(50, 255 - i * 15)
+        sprites.append(circle_sprite((fade, fade, 255), max(1, radius - i // 3)))
+    return tuple(sprites)
+# !!! END PHASE: STARFIELD !!!
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+# !!! PHASE: TEXT CACHE !!!
+# Font.render rasterizes the whole string every call. Most text on screen
+# (HUD, hints, titles, power-up letters) is the same frame after frame, so
+# rendered surfaces are kept in an LRU cache and only re-rendered when the
+# string or color actually changes.
+
+
+class TextCache:
+    def __init__(self, max_bytes=4 * 1024 * 1024, max_entries=512):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        self.bytes += _surface_bytes(surface)
+        while self._surfaces and (self.bytes > self.max_bytes or len(self._surfaces) > self.max_entries):
+            _, evicted = self._surfaces.popitem(last=False)
+            self.bytes -= _surface_bytes(evicted)
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+        self.bytes = 0
+
+
+def _surface_bytes(surface):
+    width, height = surface.get_size()
+    return width * height * surface.get_bytesize()
+
+
+TEXT_CACHE = TextCache()
+
+
+def render_text(font, text, color, antialias=True):
+    return TEXT_CACHE.render(font, text, color, antialias)
+# !!! END PHASE: TEXT CACHE !!!
@@ -0,0 +1,37 @@
+# !!! PHASE: FIXED TIMESTEP !!!
+# The game simulates in fixed steps and draws as often as the display
+# allows. Real time goes into an accumulator and is paid out one step at a
+# time; whatever is left over (less than a step) says how far between the
+# last two steps to draw. When a frame took so long that catching up would
+# take more than max_steps, the rest of the backlog is dropped: the game
+# slows down for a moment instead of spiralling into ever longer frames.
+
+
+class FixedStep:
+    def __init__(self, rate=60, max_steps=5):
+        self.rate = rate
+        self.step = 1.0 / rate
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        # Simulation time given up to the catch-up limit, in seconds
+        self.dropped = 0.0
+
+    def reset(self):
+        self.accumulator = 0.0
+
+    def advance(self, seconds):
+        # Number of steps to simulate for `seconds` of real time
+        self.accumulator += seconds
+        steps = int(self.accumulator / self.step)
+        if steps > self.max_steps:
+            self.dropped += (steps - self.max_steps) * self.step
+            steps = self.max_steps
+            self.accumulator = self.step * steps
+        self.accumulator -= steps * self.step
+        return steps
+
+    @property
+    def alpha(self):
+        # 0..1: how far the display is between the last step and the next
+        return min(1.0, self.accumulator / self.step)
+# !!! END PHASE: FIXED TIMESTEP !!!
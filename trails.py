@@ -0,0 +1,64 @@
+import functools
+
+import pygame
+
+# !!! PHASE: TRAILS !!!
+# A trail is a fixed-size ring buffer of recent positions. Every trail index
+# has its own pre-rendered circle sprite (size and fade baked in), so drawing
+# a whole trail is a single Surface.blits() call.
+
+
+class Trail:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._points = [None] * capacity
+        self._start = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        # Oldest point first, like the list the trail used to be
+        points, start, capacity = self._points, self._start, self.capacity
+        for i in range(self._length):
+            yield points[(start + i) % capacity]
+
+    def append(self, point):
+        if self._length < self.capacity:
+            self._points[(self._start + self._length) % self.capacity] = point
+            self._length += 1
+        elif self.capacity:
+            self._points[self._start] = point
+            self._start = (self._start + 1) % self.capacity
+
+    def clear(self):
+        self._start = 0
+        self._length = 0
+
+    def resize(self, capacity):
+        # Keeps the newest points that still fit
+        points = list(self)[-capacity:] if capacity else []
+        self.capacity = capacity
+        self._points = points + [None] * (capacity - len(points))
+        self._start = 0
+        self._length = len(points)
+
+    def draw(self, screen, sprites):
+        # sprites[i] is centered on the i-th oldest point. Returns the dirty rects.
+        batch = [(sprite, (x - sprite.get_width() // 2, y - sprite.get_height() // 2))
+                 for sprite, (x, y) in zip(sprites, self)]
+        return screen.blits(batch)
+
+
+@functools.lru_cache(maxsize=512)
+def circle_sprite(color, radius, alpha=255):
+    colorkey = (255, 0, 255) if color == (0, 0, 0) else (0, 0, 0)
+    sprite = pygame.Surface((radius * 2, radius * 2))
+    sprite.fill(colorkey)
+    pygame.draw.circle(sprite, color, (radius, radius), radius)
+    sprite.set_colorkey(colorkey, pygame.RLEACCEL)
+    if alpha < 255:
+        sprite.set_alpha(alpha)
+    return sprite
+# !!! END PHASE: TRAILS !!!
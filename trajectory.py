@@ -0,0 +1,138 @@
+import math
+from collections import namedtuple
+
+import pygame
+
+from collision import sweep_circle_rect
+
+# !!! PHASE: TRAJECTORY PREDICTION !!!
+# Where a ball will cross a horizontal line (normally the top of the
+# paddle), worked out from its speed instead of stepping it. Between the
+# side walls the ball travels a straight line in "unfolded" space, where
+# every bounce is a mirror image of the field; folding the end point back
+# into the field gives the landing x in constant time, and the top wall is
+# one more fold. Only the search for the first brick in the way walks the
+# path, one wall-to-wall segment at a time and only while it is inside the
+# box around the bricks, using the brick grid for candidates.
+#
+# Times are in 1/60 s frames like every speed in game_objects (a game
+# stepping at another rate takes time / state.dt steps). A stasis field
+# that runs out on the way is allowed for; hyperdrive and other power-ups
+# picked up later are not.
+
+Prediction = namedtuple('Prediction', ['x', 'time', 'bounces', 'brick', 'brick_time'])
+# Reflections followed while looking for a brick
+MAX_SEGMENTS = 256
+
+
+def fold(position, low, high):
+    # Where a point that moved to `position` along the unfolded line lies
+    # between walls at low and high, and how many times it bounced
+    span = high - low
+    if span <= 0:
+        return low, 0
+    bounces, offset = divmod(position - low, span)
+    bounces = int(bounces)
+    if bounces % 2:
+        return high - offset, abs(bounces)
+    return low + offset, abs(bounces)
+
+
+def predict(ball, line_y, bricks=None, dt=1.0):
+    # Prediction for the ball's center reaching line_y, or None when it is
+    # glued, not moving vertically or already past the line going down.
+    # brick is the first brick in the way (x and time then only hold if it
+    # breaks without deflecting the ball) and brick_time when it is hit.
+    if ball.is_glued or not ball.speed_y:
+        return None
+    radius = ball.radius
+    x, y, vx, vy = ball.x, ball.y, ball.speed_x, ball.speed_y
+    if vy > 0:
+        if y > line_y:
+            return None
+        # Distance to go, in frames at the current speed
+        distance = (line_y - y) / vy
+        top_bounces = 0
+    else:
+        distance = (y - radius + line_y - radius) / -vy
+        top_bounces = 1
+    landing_x, side_bounces = fold(x + vx * distance, radius, ball.screen_width - radius)
+
+    brick, brick_time = None, None
+    if bricks and bricks.bounds:
+        hit = _first_brick(x, y, vx, vy, radius, ball.screen_width, bricks, distance)
+        if hit:
+            brick, brick_distance = hit
+            brick_time = _elapsed(ball, brick_distance, dt)
+    return Prediction(landing_x, _elapsed(ball, distance, dt), side_bounces + top_bounces, brick, brick_time)
+
+
+def _elapsed(ball, distance, dt):
+    # Frames to cover `distance` frames' worth of the current speed, with
+    # the speed doubling when a stasis field runs out
+    if not ball.is_slowed:
+        return distance
+    # The update that uses up the timer already moves at full speed
+    slow = max(0, math.ceil(ball.slow_timer / dt - 1e-9) - 1) * dt
+    return distance if distance <= slow else slow + (distance - slow) / 2
+
+
+def _first_brick(x, y, vx, vy, radius, width, bricks, distance):
+    # (brick, distance) of the first approaching brick face on the path
+    bounds = bricks.bounds
+    travelled = 0.0
+    for _ in range(MAX_SEGMENTS):
+        # Frames until the next wall, or the line
+        to_wall = math.inf
+        if vx > 0:
+            to_wall = (width - radius - x) / vx
+        elif vx < 0:
+            to_wall = (radius - x) / vx
+        to_top = (radius - y) / vy if vy < 0 else math.inf
+        step = max(0.0, min(to_wall, to_top, distance - travelled))
+
+        hit = _segment_brick(x, y, vx * step, vy * step, radius, bricks)
+        if hit:
+            t, brick = hit
+            return brick, travelled + t * step
+        x += vx * step
+        y += vy * step
+        travelled += step
+        if travelled >= distance or (vy > 0 and y - radius > bounds.bottom):
+            return None
+        if step == to_top:
+            vy = -vy
+        if step == to_wall:
+            vx = -vx
+    return None
+
+
+def _segment_brick(x, y, dx, dy, radius, bricks):
+    # Earliest (t, brick) along one straight move. The move is cut into
+    # pieces about a grid cell long so each query only touches a few cells.
+    bounds = bricks.bounds
+    if not _swept(x, y, dx, dy, radius).colliderect(bounds):
+        return None
+    pieces = max(1, math.ceil(max(abs(dx) / bricks.cell_width, abs(dy) / bricks.cell_height)))
+    px, py = dx / pieces, dy / pieces
+    for piece in range(pieces):
+        sx, sy = x + px * piece, y + py * piece
+        swept = _swept(sx, sy, px, py, radius)
+        if not swept.colliderect(bounds):
+            continue
+        best = None
+        for brick in bricks.query(swept):
+            hit = sweep_circle_rect(sx, sy, radius, px, py, brick.rect)
+            # Faces the ball is moving away from do not count, as in Ball
+            if hit and px * hit[1] + py * hit[2] < 0 and (best is None or hit[0] < best[0]):
+                best = (hit[0], brick)
+        if best:
+            return (piece + best[0]) / pieces, best[1]
+    return None
+
+
+def _swept(x, y, dx, dy, radius):
+    left, top = math.floor(min(x, x + dx) - radius) - 1, math.floor(min(y, y + dy) - radius) - 1
+    right, bottom = math.ceil(max(x, x + dx) + radius) + 1, math.ceil(max(y, y + dy) + radius) + 1
+    return pygame.Rect(left, top, right - left, bottom - top)
+# !!! END PHASE: TRAJECTORY PREDICTION !!!